@@ -3,8 +3,19 @@ from fastapi import FastAPI
 # cors
 from fastapi.middleware.cors import CORSMiddleware
 
+from api.compression import CompressionMiddleware
+from api.db import align_threadpool
+from api.loop_monitor import LOOP_MONITOR, LoopMonitorMiddleware, loop_monitor
+
 app = FastAPI()
 
 app.add_middleware(
     CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"]
 )
+app.add_middleware(CompressionMiddleware)
+app.router.add_event_handler("startup", align_threadpool)
+
+if LOOP_MONITOR:
+    app.add_middleware(LoopMonitorMiddleware)
+    app.router.add_event_handler("startup", loop_monitor.start)
+    app.router.add_event_handler("shutdown", loop_monitor.stop)
@@ -0,0 +1,31 @@
+"""add sections.is_public
+
+Revision ID: c81d4f20a6b3
+Revises: a3c5e19b7d42
+Create Date: 2026-10-18 15:20:11.204318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c81d4f20a6b3'
+down_revision: Union[str, None] = 'a3c5e19b7d42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'sections',
+        sa.Column('is_public', sa.Boolean(), server_default=sa.false(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('sections', 'is_public')
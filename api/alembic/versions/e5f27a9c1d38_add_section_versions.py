@@ -0,0 +1,72 @@
+"""add section_versions
+
+Revision ID: e5f27a9c1d38
+Revises: c81d4f20a6b3
+Create Date: 2026-10-18 18:42:07.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5f27a9c1d38'
+down_revision: Union[str, None] = 'c81d4f20a6b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('section_versions',
+    sa.Column('section_id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('compacted_to', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['section_id'], ['sections.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('section_id')
+    )
+    op.add_column('node_changes', sa.Column('version', sa.Integer(), nullable=True))
+
+    # Версии существующих записей - их id, чтобы курсоры клиентов остались
+    # верными, счетчики разделов продолжают с последнего id
+    op.execute("UPDATE node_changes SET version = id")
+    op.alter_column('node_changes', 'version', nullable=False)
+    op.create_unique_constraint(
+        'uq__node_changes__section_id_version', 'node_changes', ['section_id', 'version']
+    )
+    op.execute(
+        """
+        INSERT INTO section_versions (section_id, version, compacted_to)
+        SELECT v.section_id, CASE WHEN v.version > v.compacted_to
+            THEN v.version ELSE v.compacted_to END, v.compacted_to
+        FROM (
+            SELECT s.id AS section_id,
+                COALESCE((SELECT MAX(c.id) FROM node_changes c
+                    WHERE c.section_id = s.id), 0) AS version,
+                COALESCE((SELECT MAX(CAST(f.value AS INTEGER)) FROM config f
+                    WHERE f.name = 'changelog' AND f.key = 'compacted_to'
+                    AND f.section_id = s.id), 0) AS compacted_to
+            FROM sections s
+        ) v
+        """
+    )
+    op.execute("DELETE FROM config WHERE name = 'changelog'")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(
+        """
+        INSERT INTO config (name, key, value, is_active, section_id, dt_create)
+        SELECT 'changelog', 'compacted_to', CAST(compacted_to AS VARCHAR), true,
+            section_id, CURRENT_TIMESTAMP
+        FROM section_versions WHERE compacted_to > 0
+        """
+    )
+    op.drop_constraint(
+        'uq__node_changes__section_id_version', 'node_changes', type_='unique'
+    )
+    op.drop_column('node_changes', 'version')
+    op.drop_table('section_versions')
@@ -0,0 +1,310 @@
+import time
+from typing import Iterable, NamedTuple
+
+import numpy as np
+
+# Сколько источников BFS брать для приближенной посредническости
+BETWEENNESS_SAMPLES = 64
+
+
+class PathTimeout(Exception): ...
+
+
+class CSRGraph(NamedTuple):
+    """
+    Неориентированный граф в формате CSR: соседи узла i лежат в
+    indices[indptr[i]:indptr[i + 1]]. Повторные связи и петли убраны.
+    edges[k] - номер в links связи, давшей ребро indices[k], чтобы
+    вернуть ее id и направление.
+    """
+
+    nodes: list[dict]
+    index: dict[str, int]
+    indptr: np.ndarray
+    indices: np.ndarray
+    links: list[dict]
+    edges: np.ndarray
+
+    @property
+    def size(self) -> int:
+        return len(self.nodes)
+
+    @property
+    def degree(self) -> np.ndarray:
+        return np.diff(self.indptr)
+
+    @property
+    def rows(self) -> np.ndarray:
+        """Номер узла-источника для каждого элемента indices"""
+        return np.repeat(np.arange(self.size), self.degree)
+
+
+class GraphMetrics(NamedTuple):
+    graph: CSRGraph
+    degree: np.ndarray
+    components: np.ndarray
+    pagerank: np.ndarray
+    eigenvector: np.ndarray
+    betweenness: np.ndarray
+
+
+def build_csr(rows: Iterable[tuple[str, dict]]) -> CSRGraph:
+    """CSR из потока строк графа ("node", {...}) и ("link", {...})"""
+    nodes = []
+    index = {}
+    links = []
+
+    for kind, row in rows:
+        if kind == "node":
+            index[row["id"]] = len(nodes)
+            nodes.append(row)
+        else:
+            links.append(row)
+
+    # Концы связей ищутся после всех узлов, связи с узлами вне графа отбрасываются
+    links = [
+        link for link in links if link["source"] in index and link["target"] in index
+    ]
+    pairs = np.array(
+        [(index[link["source"]], index[link["target"]]) for link in links],
+        dtype=np.int64,
+    ).reshape(-1, 2)
+    numbers = np.flatnonzero(pairs[:, 0] != pairs[:, 1])
+    pairs = pairs[numbers]
+
+    count = len(nodes)
+    # Из повторных связей между двумя узлами остается одна
+    codes, first = np.unique(
+        np.concatenate(
+            [pairs[:, 0] * count + pairs[:, 1], pairs[:, 1] * count + pairs[:, 0]]
+        ),
+        return_index=True,
+    )
+    row, col = np.divmod(codes, max(count, 1))
+
+    indptr = np.zeros(count + 1, dtype=np.int64)
+    np.cumsum(np.bincount(row, minlength=count), out=indptr[1:])
+
+    return CSRGraph(nodes, index, indptr, col, links, numbers[first % max(len(numbers), 1)])
+
+
+def edge_link(graph: CSRGraph, a: int, b: int) -> dict:
+    """Связь, давшая ребро между узлами a и b"""
+    start, end = graph.indptr[a], graph.indptr[a + 1]
+    # Соседи узла в indices отсортированы
+    k = start + np.searchsorted(graph.indices[start:end], b)
+
+    return graph.links[graph.edges[k]]
+
+
+def _neighbor_sum(graph: CSRGraph, rows: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Сумма values по соседям каждого узла (A @ values)"""
+    return np.bincount(rows, weights=values[graph.indices], minlength=graph.size)
+
+
+def connected_components(graph: CSRGraph) -> np.ndarray:
+    """
+    Номер компоненты связности для каждого узла: метки распространяются
+    минимумом по соседям со сжатием путей, пока не перестанут меняться.
+    """
+    labels = np.arange(graph.size)
+    rows = graph.rows
+
+    while True:
+        smallest = labels.copy()
+        np.minimum.at(smallest, rows, labels[graph.indices])
+        # Сжатие путей: метка метки тоже принадлежит компоненте
+        smallest = smallest[smallest]
+
+        if np.array_equal(smallest, labels):
+            break
+
+        labels = smallest
+
+    return np.unique(labels, return_inverse=True)[1]
+
+
+def pagerank(
+    graph: CSRGraph, damping: float = 0.85, tol: float = 1e-8, max_iter: int = 100
+) -> np.ndarray:
+    count = graph.size
+
+    if count == 0:
+        return np.zeros(0)
+
+    degree = graph.degree
+    dangling = degree == 0
+    rows = graph.rows
+    rank = np.full(count, 1 / count)
+
+    for _ in range(max_iter):
+        share = np.divide(rank, degree, out=np.zeros(count), where=~dangling)
+        # Висячие узлы раздают свой ранг поровну всем
+        spread = _neighbor_sum(graph, rows, share) + rank[dangling].sum() / count
+        updated = spread * damping + (1 - damping) / count
+
+        if np.abs(updated - rank).sum() < tol:
+            return updated
+
+        rank = updated
+
+    return rank
+
+
+def eigenvector_centrality(
+    graph: CSRGraph, tol: float = 1e-8, max_iter: int = 200
+) -> np.ndarray:
+    count = graph.size
+
+    if count == 0:
+        return np.zeros(0)
+
+    rows = graph.rows
+    vector = np.full(count, 1 / np.sqrt(count))
+
+    for _ in range(max_iter):
+        # A + I вместо A: итерации сходятся и на двудольных графах
+        updated = _neighbor_sum(graph, rows, vector) + vector
+        norm = np.linalg.norm(updated)
+
+        if norm == 0:
+            return updated
+
+        updated /= norm
+
+        if np.abs(updated - vector).sum() < tol:
+            return updated
+
+        vector = updated
+
+    return vector
+
+
+def _expand(graph: CSRGraph, frontier: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Все ребра из узлов frontier: пары (откуда, куда)"""
+    starts = graph.indptr[frontier]
+    counts = graph.indptr[frontier + 1] - starts
+    parents = np.repeat(frontier, counts)
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+
+    return parents, graph.indices[np.repeat(starts, counts) + offsets]
+
+
+def betweenness(
+    graph: CSRGraph, samples: int = BETWEENNESS_SAMPLES, seed: int = 0
+) -> np.ndarray:
+    """
+    Приближенная посредническая центральность: алгоритм Брандеса от samples
+    случайных источников, BFS идет целыми уровнями. Результат нормирован
+    к числу пар узлов, как в networkx.
+    """
+    count = graph.size
+    result = np.zeros(count)
+
+    if count < 3:
+        return result
+
+    rng = np.random.default_rng(seed)
+    sources = rng.choice(count, size=min(samples, count), replace=False)
+
+    for source in sources:
+        distance = np.full(count, -1)
+        sigma = np.zeros(count)
+        distance[source] = 0
+        sigma[source] = 1
+        frontier = np.array([source])
+        # Ребра кратчайших путей по уровням, для обратного прохода
+        levels = []
+
+        while len(frontier):
+            parents, children = _expand(graph, frontier)
+            fresh = distance[children] < 0
+            distance[children[fresh]] = distance[frontier[0]] + 1
+
+            on_path = distance[children] == distance[frontier[0]] + 1
+            parents, children = parents[on_path], children[on_path]
+            sigma += np.bincount(children, weights=sigma[parents], minlength=count)
+
+            levels.append((parents, children))
+            frontier = np.unique(children)
+
+        delta = np.zeros(count)
+
+        for parents, children in reversed(levels):
+            share = sigma[parents] / sigma[children] * (1 + delta[children])
+            delta += np.bincount(parents, weights=share, minlength=count)
+
+        delta[source] = 0
+        result += delta
+
+    # Масштаб выборки и нормировка для неориентированного графа
+    return result * (count / len(sources)) / ((count - 1) * (count - 2))
+
+
+def shortest_path(
+    graph: CSRGraph, source: int, target: int, max_hops: int, timeout: float
+) -> list[int] | None:
+    """
+    Кратчайший путь двунаправленным BFS: уровень за уровнем расширяется
+    меньший из двух фронтов. None, если пути не длиннее max_hops нет;
+    PathTimeout, если поиск не уложился в timeout секунд.
+    """
+    if source == target:
+        return [source]
+
+    deadline = time.monotonic() + timeout
+    parent = [np.full(graph.size, -1), np.full(graph.size, -1)]
+    depth = [np.full(graph.size, -1), np.full(graph.size, -1)]
+    frontier = [np.array([source]), np.array([target])]
+
+    for side, root in enumerate((source, target)):
+        parent[side][root] = root
+        depth[side][root] = 0
+
+    for _ in range(max_hops):
+        if not len(frontier[0]) or not len(frontier[1]):
+            return None
+
+        if time.monotonic() > deadline:
+            raise PathTimeout()
+
+        side = 0 if len(frontier[0]) <= len(frontier[1]) else 1
+        other = 1 - side
+
+        parents, children = _expand(graph, frontier[side])
+        fresh = depth[side][children] < 0
+        children, first = np.unique(children[fresh], return_index=True)
+
+        parent[side][children] = parents[fresh][first]
+        depth[side][children] = depth[side][frontier[side][0]] + 1
+        frontier[side] = children
+
+        meet = children[depth[other][children] >= 0]
+
+        if len(meet):
+            # Ближайшая к другому концу точка встречи дает кратчайший путь
+            node = meet[np.argmin(depth[other][meet])]
+
+            return _walk(parent[0], node)[::-1] + _walk(parent[1], node)[1:]
+
+    return None
+
+
+def _walk(parent: np.ndarray, node: int) -> list[int]:
+    path = [int(node)]
+
+    while parent[path[-1]] != path[-1]:
+        path.append(int(parent[path[-1]]))
+
+    return path
+
+
+def analyze(graph: CSRGraph, samples: int = BETWEENNESS_SAMPLES) -> GraphMetrics:
+    return GraphMetrics(
+        graph=graph,
+        degree=graph.degree,
+        components=connected_components(graph),
+        pagerank=pagerank(graph),
+        eigenvector=eigenvector_centrality(graph),
+        betweenness=betweenness(graph, samples),
+    )
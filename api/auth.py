@@ -1,16 +1,19 @@
 import os
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple
 from fastapi import Depends, Form, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy.orm.session import Session
-from passlib.context import CryptContext
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.session import Session, object_session
 from jose import ExpiredSignatureError, JWTError, jwt
 from datetime import datetime, timedelta
 from api import app
-from api.db import get_db
+from api.db import get_async_db, get_db
 from api.models import User
-
-# Хэширование паролей
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from api.passwords import password_hasher, pwd_context
 
 # Указание на то, где искать токен
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
@@ -20,6 +23,103 @@ SECRET_KEY = os.environ["SECRET"]
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# Пользователи по имени из токена: сколько секунд и сколько записей хранить
+USER_CACHE_TTL = float(os.environ.get("USER_CACHE_TTL", "60"))
+USER_CACHE_SIZE = int(os.environ.get("USER_CACHE_SIZE", "1024"))
+
+
+class CachedUser(NamedTuple):
+    """
+    Неизменяемый снимок пользователя из токена. Один снимок отдается всем
+    запросам, поэтому в нем нет ORM-объекта, который можно изменить или
+    привязать к чужой сессии.
+    """
+
+    id: int
+    username: str
+    is_active: bool
+
+    @classmethod
+    def from_user(cls, user: User) -> "CachedUser":
+        return cls(id=user.id, username=user.username, is_active=user.is_active)
+
+
+class UserCache:
+    """
+    Пользователи по имени для проверки токена без запроса к БД. Хранятся
+    снимки CachedUser. Изменение или удаление пользователя через ORM
+    сбрасывает его запись, остальное устаревает за ttl секунд.
+    """
+
+    def __init__(self, ttl: float = USER_CACHE_TTL, maxsize: int = USER_CACHE_SIZE):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[float, CachedUser]] = OrderedDict()
+
+    def get(self, username: str) -> CachedUser | None:
+        now = time.monotonic()
+
+        with self._lock:
+            cached = self._entries.get(username)
+
+            if cached is None:
+                return None
+
+            if cached[0] <= now:
+                del self._entries[username]
+                return None
+
+            self._entries.move_to_end(username)
+
+            return cached[1]
+
+    def put(self, user: CachedUser) -> None:
+        if self.ttl <= 0:
+            return
+
+        with self._lock:
+            self._entries.pop(user.username, None)
+            self._entries[user.username] = (time.monotonic() + self.ttl, user)
+
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *usernames: str) -> None:
+        with self._lock:
+            for username in usernames:
+                self._entries.pop(username, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserCache()
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_user(mapper, connection, user: User) -> None:
+    # Старое имя тоже: пользователя могли переименовать
+    history = inspect(user).attrs.username.history
+    usernames = {user.username, *history.deleted}
+    user_cache.invalidate(*usernames)
+
+    # До коммита другой запрос мог снова закэшировать старую строку
+    session = object_session(user)
+
+    if session is not None:
+        session.info.setdefault("stale_users", set()).update(usernames)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session: Session) -> None:
+    usernames = session.info.pop("stale_users", None)
+
+    if usernames:
+        user_cache.invalidate(*usernames)
+
 
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
@@ -35,10 +135,18 @@ def get_user(db: Session, username: str) -> User | None:
     return user
 
 
-def authenticate_user(db: Session, username: str, password: str) -> User | None:
-    user = get_user(db, username)
+async def get_user_async(db: AsyncSession, username: str) -> User | None:
+    return await db.scalar(select(User).where(User.username == username))
+
 
-    if user is None or not verify_password(password, user.hashed_password):
+async def authenticate_user(
+    db: AsyncSession, username: str, password: str
+) -> User | None:
+    user = await get_user_async(db, username)
+
+    if user is None or not await password_hasher.verify(
+        password, user.hashed_password
+    ):
         return None
 
     return user
@@ -54,28 +162,31 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
 
 @app.post("/register")
 async def register(
-    username: str = Form(...), password: str = Form(...), db: Session = Depends(get_db)
+    username: str = Form(...),
+    password: str = Form(...),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    user = get_user(db=db, username=username)
+    user = await get_user_async(db=db, username=username)
 
     if user is not None:
         raise HTTPException(status_code=400, detail="User already exists")
 
-    hashed_password = hash_password(password)
+    hashed_password = await password_hasher.hash(password)
 
     new_user = User(username=username, hashed_password=hashed_password)
 
     db.add(new_user)
-    db.commit()
+    await db.commit()
 
     return {"msg": "User registered successfully"}
 
 
 @app.post("/token")
 async def login(
-    form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    user = authenticate_user(db, form_data.username, form_data.password)
+    user = await authenticate_user(db, form_data.username, form_data.password)
 
     if user is None:
         raise HTTPException(
@@ -88,7 +199,7 @@ async def login(
     return {"access_token": access_token, "token_type": "bearer"}
 
 
-def check_token(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+def token_username(token: str) -> str:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
@@ -100,14 +211,50 @@ def check_token(token: str = Depends(oauth2_scheme), db: Session = Depends(get_d
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
+    return username
+
+
+def check_token(
+    token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
+) -> CachedUser:
+    username = token_username(token)
+    user = user_cache.get(username)
+
+    if user is not None:
+        return user
+
     user = get_user(db, username)
 
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
+    user = CachedUser.from_user(user)
+    user_cache.put(user)
+
+    return user
+
+
+async def check_token_async(
+    token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)
+) -> CachedUser:
+    """check_token для async-маршрутов: запрос пользователя не блокирует цикл"""
+    username = token_username(token)
+    user = user_cache.get(username)
+
+    if user is not None:
+        return user
+
+    user = await get_user_async(db, username)
+
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    user = CachedUser.from_user(user)
+    user_cache.put(user)
+
     return user
 
 
 @app.get("/me")
-async def read_users_me(user: User = Depends(check_token)):
+async def read_users_me(user: CachedUser = Depends(check_token_async)):
     return {"username": user.username}
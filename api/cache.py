@@ -0,0 +1,201 @@
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Hashable, NamedTuple, TypeVar
+
+from sqlalchemy.orm import Session
+
+from api.db import BackgroundSessionLocal, replica_router
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Ключ снапшота общего графа сотрудников
+EMPLOYEE_GRAPH = "employees"
+
+# Метка запуска процесса: версии живут в памяти и начинаются заново
+BOOT_ID = uuid.uuid4().hex
+
+
+def section_key(section_id: int) -> tuple:
+    """Ключ снапшота графа раздела"""
+    return ("section", section_id)
+
+
+def table_key(table_name: str) -> tuple:
+    """Ключ версии содержимого таблицы"""
+    return ("table", table_name)
+
+
+class VersionRegistry:
+    """
+    Счетчики версий данных, которые увеличивают пишущие методы CRUD.
+
+    Счетчики живут в памяти процесса, поэтому API запускается одним воркером.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions: dict[Hashable, int] = {}
+        self._listeners: list[Callable[[tuple], None]] = []
+
+    def get(self, key: Hashable) -> int:
+        return self._versions.get(key, 0)
+
+    def bump(self, *keys: Hashable) -> None:
+        with self._lock:
+            for key in keys:
+                self._versions[key] = self._versions.get(key, 0) + 1
+
+        for listener in self._listeners:
+            listener(keys)
+
+    def listen(self, listener: Callable[[tuple], None]) -> None:
+        """Функция, которую вызывают с ключами после каждого bump"""
+        self._listeners.append(listener)
+
+
+class SnapshotEntry(NamedTuple):
+    version: int
+    value: object
+    built_at: float = 0.0
+
+
+class SnapshotCache:
+    """
+    Кэш снапшотов графа в памяти процесса.
+
+    Устаревший снапшот отдается сразу, а пересборка уходит в фоновый поток,
+    поэтому ждать приходится только при самой первой сборке ключа. Первую
+    сборку одновременные запросы тоже ждут общую, а не делают каждый свою.
+    """
+
+    def __init__(self, versions: VersionRegistry, maxsize: int = 128, workers: int = 2):
+        self.versions = versions
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[Hashable, SnapshotEntry] = OrderedDict()
+        self._pending: set[Hashable] = set()
+        self._building: dict[Hashable, Future] = {}
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="graph-cache"
+        )
+
+    def get(
+        self,
+        key: Hashable,
+        db: Session,
+        build: Callable[[Session], T],
+        variant: Hashable = None,
+        ttl: float | None = None,
+    ) -> T:
+        """
+        Снапшот по ключу версии key. Разные представления одних и тех же данных
+        (variant) хранятся отдельно, но устаревают вместе. С ttl снапшот моложе
+        ttl секунд отдается без пересборки, даже если версия уже сменилась.
+        """
+        return self.get_entry(key, db, build, variant, ttl).value
+
+    def get_entry(
+        self,
+        key: Hashable,
+        db: Session,
+        build: Callable[[Session], T],
+        variant: Hashable = None,
+        ttl: float | None = None,
+    ) -> SnapshotEntry:
+        """То же, что get, но вместе с версией, на которой собран снапшот"""
+        current = self.versions.get(key)
+        entry_key = (key, variant)
+
+        with self._lock:
+            entry = self._entries.get(entry_key)
+            if entry is not None:
+                self._entries.move_to_end(entry_key)
+
+        if entry is not None and entry.version == current:
+            return entry
+
+        if entry is not None:
+            if ttl is None or time.monotonic() - entry.built_at >= ttl:
+                self._schedule(entry_key, current, build)
+
+            return entry
+
+        return self._build_once(entry_key, current, db, build)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def _build(
+        self, key: Hashable, version: int, db: Session, build: Callable[[Session], T]
+    ) -> SnapshotEntry:
+        built = SnapshotEntry(version, build(db), time.monotonic())
+
+        with self._lock:
+            entry = self._entries.get(key)
+            # Более свежий снапшот мог появиться, пока шла сборка
+            if entry is None or entry.version <= version:
+                self._entries[key] = built
+                self._entries.move_to_end(key)
+
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+        return built
+
+    def _build_once(
+        self, key: Hashable, version: int, db: Session, build: Callable[[Session], T]
+    ) -> SnapshotEntry:
+        """Сборка ключа, которого еще нет в кэше: одна на всех ожидающих"""
+        with self._lock:
+            future = self._building.get(key)
+            leader = future is None
+
+            if leader:
+                future = self._building[key] = Future()
+
+        if not leader:
+            return future.result()
+
+        try:
+            entry = self._build(key, version, db, build)
+            future.set_result(entry)
+
+            return entry
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._building.pop(key, None)
+
+    def _schedule(
+        self, key: Hashable, version: int, build: Callable[[Session], T]
+    ) -> None:
+        with self._lock:
+            if key in self._pending:
+                return
+            self._pending.add(key)
+
+        self._executor.submit(self._refresh, key, version, build)
+
+    def _refresh(self, key: Hashable, version: int, build: Callable[[Session], T]):
+        try:
+            with BackgroundSessionLocal() as db:
+                self._build(key, version, db, build)
+        except Exception:
+            logger.exception("Не удалось пересобрать снапшот %s", key)
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+
+
+graph_versions = VersionRegistry()
+graph_versions.listen(replica_router.note_write)
+graph_cache = SnapshotCache(graph_versions)
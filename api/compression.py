@@ -0,0 +1,202 @@
+import gzip
+import os
+import threading
+import zlib
+from collections import OrderedDict
+
+import anyio
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Ответы меньше этого размера не сжимаются: выигрыш меньше накладных расходов
+COMPRESSION_MIN_SIZE = int(os.environ.get("COMPRESSION_MIN_SIZE", "1024"))
+# Сколько байт сжатых ответов держать в памяти
+COMPRESSION_CACHE_BYTES = int(os.environ.get("COMPRESSION_CACHE_BYTES", 32 * 2**20))
+
+# Уровни для сжатия на лету: заметно быстрее максимальных при близком размере
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def negotiate(accept_encoding: str) -> str | None:
+    """Кодировка по Accept-Encoding: br, если есть brotli, затем gzip"""
+    weights = {}
+
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.partition(";")
+        weight = 1.0
+
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+
+        weights[name.strip()] = weight
+
+    supported = ["br", "gzip"] if brotli is not None else ["gzip"]
+    candidates = [
+        (weights.get(name, weights.get("*", 0.0)), -order, name)
+        for order, name in enumerate(supported)
+    ]
+    weight, _, name = max(candidates)
+
+    return name if weight > 0 else None
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+
+    return gzip.compress(data, GZIP_LEVEL, mtime=0)
+
+
+def is_compressible(content_type: str) -> bool:
+    media_type = content_type.partition(";")[0].strip().lower()
+
+    if media_type == "text/event-stream":
+        return False
+
+    return media_type.startswith("text/") or media_type.endswith(
+        ("json", "javascript", "xml", "msgpack")
+    )
+
+
+class CompressedCache:
+    """
+    Сжатые тела ответов с ETag. Ключ - ETag и кодировка, контрольная сумма
+    защищает от выдачи чужого тела при совпадении ETag. Вытесняются давно
+    не запрошенные ответы, пока суммарный размер больше max_bytes.
+    """
+
+    def __init__(self, max_bytes: int = COMPRESSION_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple[str, str], tuple[int, bytes]] = OrderedDict()
+
+    def get(self, etag: str, encoding: str, data: bytes) -> bytes:
+        key = (etag, encoding)
+        checksum = zlib.crc32(data)
+
+        with self._lock:
+            cached = self._entries.get(key)
+
+            if cached is not None and cached[0] == checksum:
+                self._entries.move_to_end(key)
+                return cached[1]
+
+        compressed = compress(data, encoding)
+
+        if len(compressed) > self.max_bytes:
+            return compressed
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+
+            if previous is not None:
+                self.size -= len(previous[1])
+
+            self._entries[key] = (checksum, compressed)
+            self.size += len(compressed)
+
+            while self.size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+        return compressed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+class CompressionMiddleware:
+    """
+    Сжатие ответов gzip или brotli по Accept-Encoding. Сжимаются только
+    ответы целиком: потоковые (ndjson, SSE) отдаются как есть, их сжимает
+    nginx. Тела ответов с ETag берутся из кэша, чтобы одинаковые снапшоты
+    не сжимались на каждый запрос.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = COMPRESSION_MIN_SIZE,
+        cache: CompressedCache | None = None,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.cache = cache if cache is not None else compressed_responses
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        start: Message | None = None
+        passthrough = False
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start, passthrough
+
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                start = message
+                return
+
+            headers = MutableHeaders(raw=start["headers"])
+            body = message.get("body", b"")
+            passthrough = True
+
+            if "content-encoding" in headers or not is_compressible(
+                headers.get("content-type", "")
+            ):
+                await send(start)
+                await send(message)
+                return
+
+            headers.add_vary_header("accept-encoding")
+
+            if (
+                encoding is None
+                or message.get("more_body", False)
+                or len(body) < self.minimum_size
+            ):
+                await send(start)
+                await send(message)
+                return
+
+            etag = headers.get("etag")
+
+            if etag and start["status"] == 200:
+                body = await anyio.to_thread.run_sync(
+                    self.cache.get, etag, encoding, body
+                )
+                # Сжатое тело не совпадает с исходным побайтно
+                headers["etag"] = etag if etag.startswith("W/") else f"W/{etag}"
+            else:
+                body = await anyio.to_thread.run_sync(compress, body, encoding)
+
+            headers["content-encoding"] = encoding
+            headers["content-length"] = str(len(body))
+
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
+
+
+compressed_responses = CompressedCache()
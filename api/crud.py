@@ -1,11 +1,21 @@
-from typing import Generic, List, TypeVar
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Generic, Iterable, List, TypeVar
 from fastapi import HTTPException, status
-from psycopg2.errors import UniqueViolation
 import sqlalchemy
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, delete, or_
-
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import and_, delete, func, or_, select, update
+from sqlalchemy.exc import IntegrityError
+
+from api.cache import EMPLOYEE_GRAPH, graph_versions, section_key, table_key
+from api.db import BackgroundSessionLocal
+from api.events import section_events
 from api.routes_helpers import RequestContext
+from api.serializers import RowSerializer, chunks
 
 
 from .models import (
@@ -13,10 +23,13 @@ from .models import (
     Department,
     Employee,
     Node,
+    NodeChange,
     NodeType,
     Position,
     Project,
     Section,
+    SectionVersion,
+    User,
     employee_department,
     employee_position,
     employee_employee,
@@ -30,6 +43,8 @@ from .schemas import (
     DepartmentRead,
     EmployeeCreate,
     EmployeeRead,
+    NodeChangeCreate,
+    NodeChangeRead,
     NodeCreate,
     NodeLink,
     NodeRead,
@@ -39,10 +54,19 @@ from .schemas import (
     PositionRead,
     ProjectCreate,
     ProjectRead,
+    NodeRef,
+    NodeTypeRef,
     SectionCreate,
     SectionRead,
+    UserSchema,
 )
 
+# Сколько хранить журнал изменений узлов и как часто его чистить
+CHANGELOG_RETENTION_HOURS = int(os.environ.get("CHANGELOG_RETENTION_HOURS", 24))
+CHANGELOG_COMPACT_EVERY = int(os.environ.get("CHANGELOG_COMPACT_EVERY", 500))
+
+logger = logging.getLogger(__name__)
+
 MODEL = TypeVar("MODEL")
 SCHEMA_CREATE = TypeVar("SCHEMA_CREATE")
 SCHEMA_READ = TypeVar("SCHEMA_READ")
@@ -51,21 +75,78 @@ SCHEMA_READ = TypeVar("SCHEMA_READ")
 class DublicateException(Exception): ...
 
 
+# SQLSTATE нарушения уникальности в Postgres
+UNIQUE_VIOLATION = "23505"
+
+
+def is_unique_violation(error: IntegrityError) -> bool:
+    """
+    Нарушение уникальности по SQLSTATE: psycopg2 отдает его в pgcode, asyncpg
+    через адаптер SQLAlchemy - в sqlstate, классы исключений у драйверов разные
+    """
+    orig = error.orig
+    code = getattr(orig, "sqlstate", None) or getattr(orig, "pgcode", None)
+
+    return code == UNIQUE_VIOLATION
+
+
+# Стратегии загрузки связей под схемы чтения, без ленивых запросов на каждый объект
+NODE_READ_OPTIONS = (
+    selectinload(Node.user),
+    selectinload(Node.nodes).joinedload(Node.type),
+    selectinload(Node.nodes_to_this).joinedload(Node.type),
+)
+NODE_TYPE_READ_OPTIONS = (
+    selectinload(NodeType.user),
+    selectinload(NodeType.nodes).options(*NODE_READ_OPTIONS),
+)
+SECTION_READ_OPTIONS = (selectinload(Section.user),)
+
+# Сериализаторы строк для быстрого чтения списков, см. read_rows
+USER_ROW = RowSerializer(UserSchema, User)
+DEPARTMENT_ROW = RowSerializer(DepartmentRead, Department)
+EMPLOYEE_ROW = RowSerializer(EmployeeRead, Employee)
+POSITION_ROW = RowSerializer(PositionRead, Position)
+PROJECT_ROW = RowSerializer(ProjectRead, Project)
+SECTION_ROW = RowSerializer(SectionRead, Section, user=USER_ROW)
+NODE_REF_ROW = RowSerializer(NodeRef, Node, type=RowSerializer(NodeTypeRef, NodeType))
+NODE_ROW = RowSerializer(NodeRead, Node, user=USER_ROW)
+NODE_TYPE_ROW = RowSerializer(NodeTypeRead, NodeType, user=USER_ROW)
+
+
 class CRUDBase(Generic[MODEL, SCHEMA_CREATE, SCHEMA_READ]):
+    # Опции загрузки для методов чтения, которые отдаются через schema_read
+    read_options: tuple = ()
+    # Сериализатор строк схемы чтения для read_rows
+    row_serializer: RowSerializer | None = None
+
     def __init__(self):
         self.model: MODEL = self.__orig_bases__[0].__args__[0]
         self.schema_create: SCHEMA_CREATE = self.__orig_bases__[0].__args__[1]
         self.schema_read: SCHEMA_READ = self.__orig_bases__[0].__args__[2]
 
+    def graph_keys(self, db: Session, obj) -> tuple:
+        """Ключи снапшотов графа, которые устаревают при изменении obj"""
+        return ()
+
+    def touch(self, *keys) -> None:
+        """Увеличивает версию таблицы модели и переданных снапшотов графа"""
+        graph_versions.bump(table_key(self.model.__tablename__), *keys)
+
     def create(self, db: Session, obj_in) -> MODEL:
         obj = self.model(**obj_in.dict())
         db.add(obj)
         db.commit()
         db.refresh(obj)
+        self.touch(*self.graph_keys(db, obj))
         return obj
 
+    def query(self, db: Session):
+        """Запрос модели с опциями загрузки для чтения"""
+        return db.query(self.model).options(*self.read_options)
+
     def get(self, db: Session, obj_id: int) -> MODEL:
-        obj = db.query(self.model).filter(self.model.id == obj_id).first()
+        obj = self.query(db).filter(self.model.id == obj_id).first()
 
         if obj is None:
             raise HTTPException(
@@ -78,9 +159,30 @@ class CRUDBase(Generic[MODEL, SCHEMA_CREATE, SCHEMA_READ]):
         self, db: Session, skip: int = 0, limit: int | None = None
     ) -> list[MODEL]:
         if limit is None:
-            return db.query(self.model).offset(skip).all()
+            return self.query(db).offset(skip).all()
         else:
-            return db.query(self.model).offset(skip).limit(limit).all()
+            return self.query(db).offset(skip).limit(limit).all()
+
+    def read_rows(
+        self, db: Session, *where, skip: int = 0, limit: int | None = None
+    ) -> list[dict]:
+        """
+        Строки схемы чтения прямо из SQL, без ORM-объектов и проверки
+        pydantic: отдаются через RowsResponse. Вложенные списки заполняет
+        fill_rows.
+        """
+        statement = self.row_serializer.select().where(*where).offset(skip)
+
+        if limit is not None:
+            statement = statement.limit(limit)
+
+        rows = self.row_serializer.rows(db.execute(statement))
+        self.fill_rows(db, rows)
+
+        return rows
+
+    def fill_rows(self, db: Session, rows: list[dict]) -> None:
+        """Заполняет в строках read_rows поля, которых нет в колонках модели"""
 
     def update(self, db: Session, obj_id: int, obj_in) -> MODEL:
         obj = self.get(db, obj_id)
@@ -89,6 +191,8 @@ class CRUDBase(Generic[MODEL, SCHEMA_CREATE, SCHEMA_READ]):
                 status_code=404, detail=f"{self.__class__.__name__}:{obj_id}:Not found"
             )
 
+        keys = self.graph_keys(db, obj)
+
         for field, value in obj_in.dict().items():
             if value is not None:
                 setattr(obj, field, value)
@@ -96,7 +200,7 @@ class CRUDBase(Generic[MODEL, SCHEMA_CREATE, SCHEMA_READ]):
         try:
             db.commit()
         except sqlalchemy.exc.IntegrityError as e:
-            if isinstance(e.orig, UniqueViolation):
+            if is_unique_violation(e):
                 message = "Такое значение уже есть"
             else:
                 message = "Ошибка при обновлении!"
@@ -104,6 +208,7 @@ class CRUDBase(Generic[MODEL, SCHEMA_CREATE, SCHEMA_READ]):
             raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=message)
 
         db.refresh(obj)
+        self.touch(*keys, *self.graph_keys(db, obj))
 
         return obj
 
@@ -113,8 +218,10 @@ class CRUDBase(Generic[MODEL, SCHEMA_CREATE, SCHEMA_READ]):
             raise HTTPException(
                 status_code=404, detail=f"{self.__class__.__name__}:{obj_id}:Not found"
             )
+        keys = self.graph_keys(db, obj)
         db.delete(obj)
         db.commit()
+        self.touch(*keys)
 
     def get_count(self, db: Session) -> int:
         count_ = db.query(self.model).count()
@@ -130,6 +237,7 @@ class CRUDBase(Generic[MODEL, SCHEMA_CREATE, SCHEMA_READ]):
 
             db.commit()
             db.refresh(obj)
+            self.touch(*self.graph_keys(db, obj))
 
             return getattr(obj, bind_attr_name)
         elif bind_obj in bind_attr:
@@ -141,11 +249,73 @@ class CRUDBase(Generic[MODEL, SCHEMA_CREATE, SCHEMA_READ]):
                 status_code=404, detail=f"{self.__class__.__name__}:{obj_id}:Not found"
             )
 
+    # Асинхронные версии для async-маршрутов. Методы выполняются через
+    # AsyncSession.run_sync: запросы идут асинхронным драйвером и не блокируют
+    # цикл событий, а логика (включая переопределения в наследниках, журнал
+    # изменений и версии кэша) общая с синхронными методами. Связи, которых
+    # нет в read_options, у возвращенных объектов лениво уже не загрузятся.
+
+    async def get_async(self, db: AsyncSession, *args, **kwargs):
+        return await db.run_sync(self.get, *args, **kwargs)
+
+    async def get_all_async(self, db: AsyncSession, *args, **kwargs):
+        return await db.run_sync(self.get_all, *args, **kwargs)
+
+    async def get_count_async(self, db: AsyncSession) -> int:
+        return await db.run_sync(self.get_count)
+
+    async def read_rows_async(self, db: AsyncSession, *where, **kwargs) -> list[dict]:
+        return await db.run_sync(self.read_rows, *where, **kwargs)
+
+    async def create_async(self, db: AsyncSession, *args, **kwargs):
+        return await db.run_sync(self.create, *args, **kwargs)
+
+    async def update_async(self, db: AsyncSession, *args, **kwargs):
+        return await db.run_sync(self.update, *args, **kwargs)
+
+    async def delete_async(self, db: AsyncSession, *args, **kwargs) -> None:
+        await db.run_sync(self.delete, *args, **kwargs)
+
+
+class CRUDEmployeeGraph(CRUDBase[MODEL, SCHEMA_CREATE, SCHEMA_READ]):
+    """Базовый CRUD для сущностей, из которых строится граф сотрудников"""
 
-class CRUDDepartment(CRUDBase[Department, DepartmentCreate, DepartmentRead]): ...
+    def graph_keys(self, db: Session, obj) -> tuple:
+        return (EMPLOYEE_GRAPH,)
 
 
-class CRUDEmployee(CRUDBase[Employee, EmployeeCreate, EmployeeRead]):
+class CRUDDepartment(CRUDEmployeeGraph[Department, DepartmentCreate, DepartmentRead]):
+    row_serializer = DEPARTMENT_ROW
+
+
+class CRUDEmployee(CRUDEmployeeGraph[Employee, EmployeeCreate, EmployeeRead]):
+    row_serializer = EMPLOYEE_ROW
+
+    # Связи сотрудника для get_bind_rows: сериализатор связанной сущности,
+    # колонки таблицы связи со ссылкой на сотрудника и на связанную сущность
+    BIND_ROWS = {
+        "departments": (
+            DEPARTMENT_ROW,
+            employee_department.c.employee_uuid,
+            employee_department.c.departments_id,
+        ),
+        "employees": (
+            EMPLOYEE_ROW,
+            employee_employee.c.employee1_uuid,
+            employee_employee.c.employee2_uuid,
+        ),
+        "positions": (
+            POSITION_ROW,
+            employee_position.c.employee_uuid,
+            employee_position.c.position_id,
+        ),
+        "projects": (
+            PROJECT_ROW,
+            employee_project.c.employee_uuid,
+            employee_project.c.project_id,
+        ),
+    }
+
     def bind_employee(self, db: Session, uuid1: str, uuid2: str):
         db.execute(
             employee_employee.insert().values(
@@ -153,6 +323,7 @@ class CRUDEmployee(CRUDBase[Employee, EmployeeCreate, EmployeeRead]):
             )
         )
         db.commit()
+        self.touch(EMPLOYEE_GRAPH)
 
     def get(self, db: Session, obj_id: str) -> MODEL:
         obj = db.query(self.model).filter(self.model.uuid == obj_id).first()
@@ -176,6 +347,20 @@ class CRUDEmployee(CRUDBase[Employee, EmployeeCreate, EmployeeRead]):
 
         return data
 
+    def get_bind_rows(
+        self, db: Session, name: str, uuid: str | None = None
+    ) -> list[dict]:
+        """То же, что get_bind_*, строками read_rows"""
+        serializer, owner, target = self.BIND_ROWS[name]
+        statement = serializer.select().join(
+            target.table, target == getattr(serializer.model, serializer.key)
+        )
+
+        if uuid is not None:
+            statement = statement.where(owner == uuid)
+
+        return serializer.rows(db.execute(statement))
+
     def get_bind_department(self, db: Session, uuid: str | None = None):
         query_ = db.query(Department).join(
             employee_department, Department.id == employee_department.c.departments_id
@@ -219,6 +404,7 @@ class CRUDEmployee(CRUDBase[Employee, EmployeeCreate, EmployeeRead]):
             .where(employee_department.c.departments_id == id)
         )
         db.commit()
+        self.touch(EMPLOYEE_GRAPH)
 
     def delete_bind_employee(self, db: Session, uuid1: str, uuid2: str):
         db.execute(
@@ -227,6 +413,7 @@ class CRUDEmployee(CRUDBase[Employee, EmployeeCreate, EmployeeRead]):
             .where(employee_employee.c.employee2_uuid == uuid2)
         )
         db.commit()
+        self.touch(EMPLOYEE_GRAPH)
 
     def delete_bind_position(self, db: Session, uuid: str, id: int):
         db.execute(
@@ -235,6 +422,7 @@ class CRUDEmployee(CRUDBase[Employee, EmployeeCreate, EmployeeRead]):
             .where(employee_position.c.position_id == id)
         )
         db.commit()
+        self.touch(EMPLOYEE_GRAPH)
 
     def delete_bind_project(self, db: Session, uuid: str, id: int):
         db.execute(
@@ -243,12 +431,15 @@ class CRUDEmployee(CRUDBase[Employee, EmployeeCreate, EmployeeRead]):
             .where(employee_project.c.project_id == id)
         )
         db.commit()
+        self.touch(EMPLOYEE_GRAPH)
 
 
-class CRUDPosition(CRUDBase[Position, PositionCreate, PositionRead]): ...
+class CRUDPosition(CRUDEmployeeGraph[Position, PositionCreate, PositionRead]):
+    row_serializer = POSITION_ROW
 
 
-class CRUDProject(CRUDBase[Project, ProjectCreate, ProjectRead]): ...
+class CRUDProject(CRUDEmployeeGraph[Project, ProjectCreate, ProjectRead]):
+    row_serializer = PROJECT_ROW
 
 
 class CRUDConfig(CRUDBase[Config, ConfigSchemaCreate, ConfigSchemaRead]):
@@ -272,6 +463,7 @@ class CRUDConfig(CRUDBase[Config, ConfigSchemaCreate, ConfigSchemaRead]):
         db.add(obj)
         db.commit()
         db.refresh(obj)
+        self.touch()
 
         return obj
 
@@ -319,11 +511,18 @@ class CRUDConfig(CRUDBase[Config, ConfigSchemaCreate, ConfigSchemaRead]):
 
             db.commit()
             db.refresh(obj)
+            self.touch()
 
             return obj
 
 
 class CRUDSection(CRUDBase[Section, SectionCreate, SectionRead]):
+    read_options = SECTION_READ_OPTIONS
+    row_serializer = SECTION_ROW
+
+    def graph_keys(self, db: Session, obj) -> tuple:
+        return (section_key(obj.id),)
+
     def create(self, db: Session, obj_in: SectionCreate) -> MODEL:
         current = (
             db.query(self.model)
@@ -339,33 +538,263 @@ class CRUDSection(CRUDBase[Section, SectionCreate, SectionRead]):
                 detail=f"Раздел с именем '{obj_in.name}' уже существует для пользователя {obj_in.user_id}.",
             )
 
-        obj = self.model(**obj_in.model_dump())
+        obj = self.model(**obj_in.model_dump(exclude_none=True))
 
         db.add(obj)
         db.commit()
         db.refresh(obj)
+        self.touch(*self.graph_keys(db, obj))
 
         return obj
 
     def get_by_name(self, db: Session, name: str) -> MODEL | None:
-        return db.query(self.model).filter(self.model.name == name).first()
+        return self.query(db).filter(self.model.name == name).first()
 
     def get_by_user_id(self, db: Session, user_id: int) -> List[MODEL]:
-        return db.query(self.model).filter(self.model.user_id == user_id).all()
+        return self.query(db).filter(self.model.user_id == user_id).all()
+
+    def get_rows_by_user_id(self, db: Session, user_id: int) -> list[dict]:
+        return self.read_rows(db, self.model.user_id == user_id)
 
 
 class CRUDNodeType(CRUDBase[NodeType, NodeTypeCreate, NodeTypeRead]):
+    read_options = NODE_TYPE_READ_OPTIONS
+    row_serializer = NODE_TYPE_ROW
+
+    def graph_keys(self, db: Session, obj) -> tuple:
+        return (section_key(obj.section_id),)
+
     def get_by_name(self, db: Session, name: str) -> MODEL | None:
-        return db.query(self.model).filter(self.model.name == name).first()
+        return self.query(db).filter(self.model.name == name).first()
 
     def get_by_user_id(self, db: Session, user_id: int) -> List[MODEL]:
-        return db.query(self.model).filter(self.model.user_id == user_id).all()
+        return self.query(db).filter(self.model.user_id == user_id).all()
 
     def get_by_section_id(self, db: Session, section_id: int) -> List[MODEL]:
-        return db.query(self.model).filter(self.model.section_id == section_id).all()
+        return self.query(db).filter(self.model.section_id == section_id).all()
+
+    def get_rows_by_user_id(self, db: Session, user_id: int) -> list[dict]:
+        return self.read_rows(db, self.model.user_id == user_id)
+
+    def get_rows_by_section_id(self, db: Session, section_id: int) -> list[dict]:
+        return self.read_rows(db, self.model.section_id == section_id)
+
+    def fill_rows(self, db: Session, rows: list[dict]) -> None:
+        by_id = {row["id"]: row for row in rows}
+        nodes = []
+
+        for ids in chunks(list(by_id)):
+            statement = (
+                NODE_ROW.select().add_columns(Node.type_id).where(Node.type_id.in_(ids))
+            )
+
+            for row in db.execute(statement):
+                node = NODE_ROW(row)
+                nodes.append(node)
+                by_id[row[-1]]["nodes"].append(node)
+
+        node_crud.fill_rows(db, nodes)
+
+
+class CRUDNodeChange(CRUDBase[NodeChange, NodeChangeCreate, NodeChangeRead]):
+    ENTITY_NODE = "node"
+    ENTITY_LINK = "link"
+
+    ACTION_ADD = "add"
+    ACTION_RENAME = "rename"
+    ACTION_REMOVE = "remove"
+
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+        self._recorded = 0
+        self._compacting = False
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="changelog-compact"
+        )
+
+    def record(
+        self,
+        db: Session,
+        section_ids: Iterable[int],
+        entity: str,
+        action: str,
+        node_id: int,
+        node2_id: int | None = None,
+        **payload,
+    ) -> None:
+        """
+        Добавляет записи в журнал в текущей транзакции, коммит за вызывающим.
+        После коммита события нужно разослать подписчикам через publish,
+        payload уходит в событие, но не в журнал.
+        """
+        events = db.info.setdefault("node_events", [])
+        # Счетчики блокируются в одном порядке, чтобы транзакции не ждали друг друга
+        section_ids = sorted(set(section_ids))
+
+        for section_id in section_ids:
+            version = self.next_version(db, section_id)
+            db.add(
+                self.model(
+                    section_id=section_id,
+                    version=version,
+                    entity=entity,
+                    action=action,
+                    node_id=node_id,
+                    node2_id=node2_id,
+                )
+            )
+
+            events.append(
+                (
+                    section_id,
+                    dict(
+                        version=version,
+                        entity=entity,
+                        action=action,
+                        node_id=node_id,
+                        node2_id=node2_id,
+                        **payload,
+                    ),
+                )
+            )
+
+        db.flush()
+
+        with self._lock:
+            self._recorded += len(section_ids)
+
+    def next_version(self, db: Session, section_id: int) -> int:
+        """
+        Следующая версия журнала раздела. UPDATE блокирует строку счетчика до
+        конца транзакции: следующий писатель ждет коммита, поэтому версии
+        идут без пропусков и в порядке коммитов.
+        """
+        statement = (
+            update(SectionVersion)
+            .where(SectionVersion.section_id == section_id)
+            .values(version=SectionVersion.version + 1)
+            .returning(SectionVersion.version)
+        )
+        version = db.scalar(statement)
+
+        if version is not None:
+            return version
+
+        # Первая запись раздела: счетчик создается, параллельная вставка
+        # другой транзакции откатывает только точку сохранения
+        try:
+            with db.begin_nested():
+                db.add(SectionVersion(section_id=section_id, version=0, compacted_to=0))
+        except IntegrityError:
+            pass
+
+        return db.scalar(statement)
+
+    def publish(self, db: Session) -> None:
+        """Рассылает подписчикам разделов события закоммиченных изменений"""
+        for section_id, event in db.info.pop("node_events", []):
+            section_events.publish(section_id, event)
+
+    def get_since(self, db: Session, section_id: int, since: int) -> List[MODEL]:
+        return (
+            db.query(self.model)
+            .filter(self.model.section_id == section_id, self.model.version > since)
+            .order_by(self.model.version)
+            .all()
+        )
+
+    def get_version(self, db: Session, section_id: int) -> int:
+        version = db.scalar(
+            select(SectionVersion.version).where(
+                SectionVersion.section_id == section_id
+            )
+        )
+
+        return version or 0
+
+    def get_watermark(self, db: Session, section_id: int) -> int:
+        """Версия, до которой журнал раздела уже удален"""
+        compacted_to = db.scalar(
+            select(SectionVersion.compacted_to).where(
+                SectionVersion.section_id == section_id
+            )
+        )
+
+        return compacted_to or 0
+
+    def compact(self, db: Session) -> None:
+        """Удаляет старые записи и запоминает для разделов, докуда журнал удален"""
+        cutoff = datetime.now() - timedelta(hours=CHANGELOG_RETENTION_HOURS)
+
+        compacted = db.execute(
+            select(self.model.section_id, func.max(self.model.version))
+            .where(self.model.dt_create < cutoff)
+            .group_by(self.model.section_id)
+        ).all()
+
+        for section_id, max_version in compacted:
+            db.execute(
+                delete(self.model).where(
+                    self.model.section_id == section_id,
+                    self.model.version <= max_version,
+                )
+            )
+            db.execute(
+                update(SectionVersion)
+                .where(
+                    SectionVersion.section_id == section_id,
+                    SectionVersion.compacted_to < max_version,
+                )
+                .values(compacted_to=max_version)
+            )
+
+        db.commit()
+
+    def compact_if_needed(self) -> None:
+        """Чистка журнала в фоновом потоке раз в CHANGELOG_COMPACT_EVERY записей"""
+        with self._lock:
+            if self._recorded < CHANGELOG_COMPACT_EVERY or self._compacting:
+                return
+
+            self._recorded = 0
+            self._compacting = True
+
+        self._executor.submit(self._run_compact)
+
+    def _run_compact(self) -> None:
+        try:
+            with BackgroundSessionLocal() as db:
+                self.compact(db)
+        except Exception:
+            logger.exception("Не удалось очистить журнал изменений")
+        finally:
+            with self._lock:
+                self._compacting = False
 
 
 class CRUDNode(CRUDBase[Node, NodeCreate, NodeRead]):
+    read_options = NODE_READ_OPTIONS
+    row_serializer = NODE_ROW
+
+    def graph_keys(self, db: Session, obj) -> tuple:
+        return self.section_keys(db, obj.id)
+
+    def section_ids(self, db: Session, *node_ids: int) -> List[int]:
+        """Разделы, в которые входят узлы"""
+        return db.scalars(
+            select(NodeType.section_id)
+            .join(Node, Node.type_id == NodeType.id)
+            .where(Node.id.in_(node_ids))
+            .distinct()
+        ).all()
+
+    def section_keys(self, db: Session, *node_ids: int) -> tuple:
+        """Ключи снапшотов разделов, в которые входят узлы"""
+        return tuple(
+            section_key(section_id) for section_id in self.section_ids(db, *node_ids)
+        )
+
     def create(self, db: Session, obj_in) -> MODEL:
         section_id = obj_in.section_id
 
@@ -392,22 +821,77 @@ class CRUDNode(CRUDBase[Node, NodeCreate, NodeRead]):
         node = Node(**obj)
 
         db.add(node)
+        db.flush()
+        node_change_crud.record(
+            db,
+            self.section_ids(db, node.id),
+            node_change_crud.ENTITY_NODE,
+            node_change_crud.ACTION_ADD,
+            node.id,
+            **self.event_payload(node),
+        )
         db.commit()
         db.refresh(node)
+        self.touch(*self.graph_keys(db, node))
+        node_change_crud.publish(db)
+        node_change_crud.compact_if_needed()
 
         return node
 
+    def event_payload(self, node: Node) -> dict:
+        """Данные узла для события, чтобы подписчику не ходить за ними в API"""
+        return dict(
+            name=node.name,
+            type=node.type.name,
+            type_description=node.type.description,
+            color=node.type.color,
+        )
+
+    def update(self, db: Session, obj_id: int, obj_in) -> MODEL:
+        node = self.get(db, obj_id)
+
+        if obj_in.name is not None and obj_in.name != node.name:
+            node_change_crud.record(
+                db,
+                self.section_ids(db, node.id),
+                node_change_crud.ENTITY_NODE,
+                node_change_crud.ACTION_RENAME,
+                node.id,
+                **{**self.event_payload(node), "name": obj_in.name},
+            )
+
+        node = super().update(db, obj_id, obj_in)
+        node_change_crud.publish(db)
+        node_change_crud.compact_if_needed()
+
+        return node
+
+    def delete(self, db: Session, obj_id: int) -> None:
+        node = self.get(db, obj_id)
+
+        node_change_crud.record(
+            db,
+            self.section_ids(db, node.id),
+            node_change_crud.ENTITY_NODE,
+            node_change_crud.ACTION_REMOVE,
+            node.id,
+        )
+
+        super().delete(db, obj_id)
+        node_change_crud.publish(db)
+        node_change_crud.compact_if_needed()
+
     def get_by_id(self, db: Session, node_id: int) -> MODEL | None:
-        return db.query(self.model).filter(self.model.id == node_id).first()
+        return self.query(db).filter(self.model.id == node_id).first()
 
     def get_by_name(self, db: Session, name: str) -> MODEL | None:
-        return db.query(self.model).filter(self.model.name == name).first()
+        return self.query(db).filter(self.model.name == name).first()
 
     def get_by_section_id(
         self, db: Session, section_id: int, offset: int = 0, limit: int | None = None
     ) -> MODEL | None:
         q = (
-            db.query(self.model)
+            self.query(db)
             .filter(
                 self.model.type_id == NodeType.id, NodeType.section_id == section_id
             )
@@ -420,7 +904,37 @@ class CRUDNode(CRUDBase[Node, NodeCreate, NodeRead]):
         return q.all()
 
     def get_by_user_id(self, db: Session, user_id: int) -> List[MODEL]:
-        return db.query(self.model).filter(self.model.user_id == user_id).all()
+        return self.query(db).filter(self.model.user_id == user_id).all()
+
+    def get_rows_by_user_id(self, db: Session, user_id: int) -> list[dict]:
+        return self.read_rows(db, self.model.user_id == user_id)
+
+    def get_rows_by_section_id(self, db: Session, section_id: int) -> list[dict]:
+        return self.read_rows(
+            db,
+            self.model.type_id.in_(
+                select(NodeType.id).where(NodeType.section_id == section_id)
+            ),
+        )
+
+    def fill_rows(self, db: Session, rows: list[dict]) -> None:
+        """Связанные узлы в обе стороны, как у NodeRead.nodes и nodes_to_this"""
+        by_id = {row["id"]: row for row in rows}
+
+        for field, own, other in (
+            ("nodes", node_node.c.node1_id, node_node.c.node2_id),
+            ("nodes_to_this", node_node.c.node2_id, node_node.c.node1_id),
+        ):
+            for ids in chunks(list(by_id)):
+                statement = (
+                    NODE_REF_ROW.select()
+                    .add_columns(own)
+                    .join(node_node, other == Node.id)
+                    .where(own.in_(ids))
+                )
+
+                for row in db.execute(statement):
+                    by_id[row[-1]][field].append(NODE_REF_ROW(row))
 
     def link(self, db: Session, obj_in: NodeLink):
         node_node_link = (
@@ -453,20 +967,43 @@ class CRUDNode(CRUDBase[Node, NodeCreate, NodeRead]):
                 user_id=obj_in.user_id,
             )
         )
+        node_change_crud.record(
+            db,
+            self.section_ids(db, obj_in.node1_id, obj_in.node2_id),
+            node_change_crud.ENTITY_LINK,
+            node_change_crud.ACTION_ADD,
+            obj_in.node1_id,
+            obj_in.node2_id,
+        )
 
         db.commit()
+        self.touch(*self.section_keys(db, obj_in.node1_id, obj_in.node2_id))
+        node_change_crud.publish(db)
+        node_change_crud.compact_if_needed()
 
     def delete_link(self, ctx: RequestContext, node_id_1: int, node_id_2: int):
         db = ctx.db
 
-        delete_ = delete(node_node).where(
-            ((node_node.c.node1_id == node_id_1) & (node_node.c.node2_id == node_id_2))
-            | (
-                (node_node.c.node1_id == node_id_2)
-                & (node_node.c.node2_id == node_id_1)
+        where_ = (
+            (node_node.c.node1_id == node_id_1) & (node_node.c.node2_id == node_id_2)
+        ) | ((node_node.c.node1_id == node_id_2) & (node_node.c.node2_id == node_id_1))
+
+        section_ids = self.section_ids(db, node_id_1, node_id_2)
+
+        # Журналу нужен порядок узлов, в котором связь хранится
+        for node1_id, node2_id in db.execute(
+            select(node_node.c.node1_id, node_node.c.node2_id).where(where_)
+        ):
+            node_change_crud.record(
+                db,
+                section_ids,
+                node_change_crud.ENTITY_LINK,
+                node_change_crud.ACTION_REMOVE,
+                node1_id,
+                node2_id,
             )
-        )
-        deleted = db.execute(delete_).rowcount
+
+        deleted = db.execute(delete(node_node).where(where_)).rowcount
 
         try:
             assert deleted > 0, "Нет записей для удаления"
@@ -475,6 +1012,9 @@ class CRUDNode(CRUDBase[Node, NodeCreate, NodeRead]):
             raise HTTPException(status_code=400, detail=str(e))
 
         db.commit()
+        self.touch(*self.section_keys(db, node_id_1, node_id_2))
+        node_change_crud.publish(db)
+        node_change_crud.compact_if_needed()
 
 
 # ----------- CRUD объекты -----------
@@ -487,3 +1027,4 @@ config_crud = CRUDConfig()
 section_crud = CRUDSection()
 node_type_crud = CRUDNodeType()
 node_crud = CRUDNode()
+node_change_crud = CRUDNodeChange()
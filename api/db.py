@@ -1,15 +1,329 @@
 import os
-from sqlalchemy import create_engine
+import threading
+import time
+from collections import OrderedDict
+
+import anyio.to_thread
+from sqlalchemy import create_engine, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from dotenv import load_dotenv
+from starlette.requests import Request
 
 load_dotenv()
 
 DATABASE_URL = os.environ['DB_URL']
 
-engine = create_engine(DATABASE_URL)
+# Пул соединений каждого движка: постоянные соединения, сверх них
+# временные, ожидание свободного соединения в секундах, пересоздание
+# соединений старше DB_POOL_RECYCLE секунд (-1 - не пересоздавать)
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "1") == "1"
+# Потоки для синхронных маршрутов: каждый держит соединение, поэтому по
+# умолчанию столько же, сколько соединений в пуле, и лишние запросы ждут
+# поток, а не соединение внутри потока
+THREADPOOL_SIZE = int(
+    os.environ.get("THREADPOOL_SIZE", str(DB_POOL_SIZE + DB_MAX_OVERFLOW))
+)
+# Фоновые потоки (пересборка снапшотов, публикация, сжатие журнала) и
+# потоковые ответы NDJSON держат соединения вне пула потоков маршрутов,
+# поэтому читают через свои небольшие пулы и не отнимают соединения у
+# THREADPOOL_SIZE потоков
+DB_BACKGROUND_POOL_SIZE = int(os.environ.get("DB_BACKGROUND_POOL_SIZE", "4"))
+DB_STREAM_POOL_SIZE = int(os.environ.get("DB_STREAM_POOL_SIZE", "4"))
+
+# Необязательная реплика для чтения. Писавший клиент читает с основной базы
+# еще DB_REPLICA_PIN_SECONDS секунд, столько же после любой записи с основной
+# читаются версионированные данные: отставание реплики должно быть меньше
+DB_REPLICA_URL = os.environ.get("DB_REPLICA_URL")
+DB_REPLICA_PIN_SECONDS = float(os.environ.get("DB_REPLICA_PIN_SECONDS", "5"))
+
+# Асинхронные драйверы для тех же баз, что и у синхронного движка
+ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
+
+def async_url(url: str) -> str:
+    """URL той же базы для асинхронного движка"""
+    url = make_url(url)
+    backend = url.get_backend_name()
+
+    if backend in ASYNC_DRIVERS:
+        url = url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+
+    return url.render_as_string(hide_password=False)
+
+
+class PoolStatsMixin:
+    """Время получения соединения из пула и число таймаутов ожидания"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def connect(self):
+        started = time.perf_counter()
+        timeout = False
+
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            timeout = True
+            raise
+        finally:
+            wait = time.perf_counter() - started
+
+            with self._stats_lock:
+                self.checkouts += 1
+                self.timeouts += timeout
+                self.wait_total += wait
+                self.wait_max = max(self.wait_max, wait)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            checkouts = self.checkouts
+            timeouts = self.timeouts
+            wait_total = self.wait_total
+            wait_max = self.wait_max
+
+        return {
+            "size": self.size(),
+            "max_overflow": self._max_overflow,
+            "checked_out": self.checkedout(),
+            "checked_in": self.checkedin(),
+            # QueuePool считает незаполненный пул отрицательным переполнением
+            "overflow": max(self.overflow(), 0),
+            "checkouts": checkouts,
+            "timeouts": timeouts,
+            "wait_time_total_ms": round(wait_total * 1000, 1),
+            "wait_time_max_ms": round(wait_max * 1000, 1),
+        }
+
+
+class InstrumentedQueuePool(PoolStatsMixin, QueuePool): ...
+
+
+class InstrumentedAsyncQueuePool(PoolStatsMixin, AsyncAdaptedQueuePool): ...
+
+
+def pool_options(
+    url: str,
+    poolclass: type,
+    pool_size: int = DB_POOL_SIZE,
+    max_overflow: int = DB_MAX_OVERFLOW,
+) -> dict:
+    """Настройки пула для create_engine из переменных DB_POOL_*"""
+    url = make_url(url)
+
+    # База SQLite в памяти живет в одном соединении, пул не настраивается
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return {}
+
+    return dict(
+        poolclass=poolclass,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+    )
+
+
+ASYNC_DATABASE_URL = os.environ.get("DB_ASYNC_URL") or async_url(DATABASE_URL)
+
+engine = create_engine(
+    DATABASE_URL, **pool_options(DATABASE_URL, InstrumentedQueuePool)
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-def get_db():
-    with SessionLocal() as db:
-        yield db
\ No newline at end of file
+
+def side_engine(pool_size: int):
+    """Отдельный пул той же базы без временных соединений"""
+    options = pool_options(DATABASE_URL, InstrumentedQueuePool, pool_size, 0)
+
+    # База SQLite в памяти видна только через соединение основного движка
+    return create_engine(DATABASE_URL, **options) if options else engine
+
+
+background_engine = side_engine(DB_BACKGROUND_POOL_SIZE)
+BackgroundSessionLocal = sessionmaker(
+    autocommit=False, autoflush=False, bind=background_engine
+)
+stream_engine = side_engine(DB_STREAM_POOL_SIZE)
+StreamSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=stream_engine)
+
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL, **pool_options(ASYNC_DATABASE_URL, InstrumentedAsyncQueuePool)
+)
+# Объекты после commit не перечитываются: ленивая загрузка вне await невозможна
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, autoflush=False, expire_on_commit=False
+)
+
+if DB_REPLICA_URL:
+    ASYNC_REPLICA_URL = os.environ.get("DB_REPLICA_ASYNC_URL") or async_url(
+        DB_REPLICA_URL
+    )
+    replica_engine = create_engine(
+        DB_REPLICA_URL, **pool_options(DB_REPLICA_URL, InstrumentedQueuePool)
+    )
+    async_replica_engine = create_async_engine(
+        ASYNC_REPLICA_URL,
+        **pool_options(ASYNC_REPLICA_URL, InstrumentedAsyncQueuePool),
+    )
+else:
+    replica_engine = engine
+    async_replica_engine = async_engine
+
+ReplicaSessionLocal = sessionmaker(
+    autocommit=False, autoflush=False, bind=replica_engine
+)
+AsyncReplicaSessionLocal = async_sessionmaker(
+    async_replica_engine, autoflush=False, expire_on_commit=False
+)
+
+READ_METHODS = ("GET", "HEAD")
+
+
+def request_client(request: Request) -> str | None:
+    """Токен клиента из заголовка или параметра token, как у потоков событий"""
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+
+    if scheme.lower() == "bearer" and token:
+        return token
+
+    return request.query_params.get("token")
+
+
+class ReplicaRouter:
+    """
+    Выбор базы для запроса: GET и HEAD читают с реплики, остальные идут на
+    основную. Клиент, который только что писал, и все запросы сразу после
+    изменения версионированных данных читают с основной: иначе ETag и
+    снапшоты новой версии собрались бы из отстающей реплики.
+    """
+
+    def __init__(self, enabled: bool, pin_seconds: float, max_clients: int = 10000):
+        self.enabled = enabled
+        self.pin_seconds = pin_seconds
+        self.max_clients = max_clients
+        self._lock = threading.Lock()
+        self._pins: OrderedDict[str, float] = OrderedDict()
+        self._fresh_until = 0.0
+
+    def pin(self, client: str) -> None:
+        until = time.monotonic() + self.pin_seconds
+
+        with self._lock:
+            self._pins.pop(client, None)
+            self._pins[client] = until
+
+            while len(self._pins) > self.max_clients:
+                self._pins.popitem(last=False)
+
+    def note_write(self, *_) -> None:
+        self._fresh_until = time.monotonic() + self.pin_seconds
+
+    def use_replica(self, request: Request) -> bool:
+        if not self.enabled or request.method not in READ_METHODS:
+            return False
+
+        now = time.monotonic()
+
+        if now < self._fresh_until:
+            return False
+
+        client = request_client(request)
+
+        if client is None:
+            return True
+
+        with self._lock:
+            until = self._pins.get(client)
+
+            if until is not None and until <= now:
+                del self._pins[client]
+                until = None
+
+        return until is None
+
+    def after_request(self, request: Request) -> None:
+        if not self.enabled or request.method in READ_METHODS:
+            return
+
+        client = request_client(request)
+
+        if client is not None:
+            self.pin(client)
+
+
+replica_router = ReplicaRouter(DB_REPLICA_URL is not None, DB_REPLICA_PIN_SECONDS)
+
+
+def align_threadpool() -> None:
+    """Размер пула потоков anyio, в котором FastAPI выполняет def-маршруты"""
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+
+
+def _stats(pool) -> dict | None:
+    return pool.stats() if isinstance(pool, PoolStatsMixin) else None
+
+
+def pool_stats() -> dict:
+    threads = anyio.to_thread.current_default_thread_limiter().statistics()
+
+    replica = replica_engine is not engine
+
+    return {
+        "engine": _stats(engine.pool),
+        "background_engine": (
+            _stats(background_engine.pool) if background_engine is not engine else None
+        ),
+        "stream_engine": (
+            _stats(stream_engine.pool) if stream_engine is not engine else None
+        ),
+        "async_engine": _stats(async_engine.pool),
+        "replica_engine": _stats(replica_engine.pool) if replica else None,
+        "async_replica_engine": (
+            _stats(async_replica_engine.pool) if replica else None
+        ),
+        "threadpool": {
+            "size": threads.total_tokens,
+            "busy": threads.borrowed_tokens,
+            "waiting": threads.tasks_waiting,
+        },
+    }
+
+
+def get_db(request: Request):
+    if replica_router.use_replica(request):
+        session = ReplicaSessionLocal
+    else:
+        session = SessionLocal
+
+    try:
+        with session() as db:
+            yield db
+    finally:
+        replica_router.after_request(request)
+
+
+async def get_async_db(request: Request):
+    if replica_router.use_replica(request):
+        session = AsyncReplicaSessionLocal
+    else:
+        session = AsyncSessionLocal
+
+    try:
+        async with session() as db:
+            yield db
+    finally:
+        replica_router.after_request(request)
@@ -0,0 +1,69 @@
+import asyncio
+import threading
+from contextlib import contextmanager
+from typing import Hashable, Iterator
+
+# Событие, после которого подписчику нужно перечитать граф целиком
+RESET_EVENT = {"action": "reset"}
+
+
+class Subscription:
+    def __init__(self, loop: asyncio.AbstractEventLoop, maxsize: int):
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+
+    def deliver(self, event: dict) -> None:
+        """Выполняется в цикле событий подписчика"""
+        if self.queue.full():
+            # Медленный клиент: вместо потерянных событий просим перезагрузку
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            event = RESET_EVENT
+
+        self.queue.put_nowait(event)
+
+
+class EventBroker:
+    """
+    Рассылка событий подписчикам внутри процесса.
+
+    Публиковать можно из любого потока (синхронные маршруты работают
+    в пуле потоков), доставка идет через цикл событий подписчика.
+    Подписчик держит только очередь, соединения с БД у него нет.
+    """
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._subscribers: dict[Hashable, set[Subscription]] = {}
+
+    @contextmanager
+    def subscribe(self, channel: Hashable) -> Iterator[asyncio.Queue]:
+        subscription = Subscription(asyncio.get_running_loop(), self.maxsize)
+
+        with self._lock:
+            self._subscribers.setdefault(channel, set()).add(subscription)
+
+        try:
+            yield subscription.queue
+        finally:
+            with self._lock:
+                subscribers = self._subscribers.get(channel, set())
+                subscribers.discard(subscription)
+
+                if not subscribers:
+                    self._subscribers.pop(channel, None)
+
+    def publish(self, channel: Hashable, event: dict) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+            except RuntimeError:
+                # Цикл событий уже закрыт, подписка уйдет при выходе из subscribe
+                pass
+
+
+section_events = EventBroker()
@@ -0,0 +1,225 @@
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Hashable, Iterable
+
+import numpy as np
+
+# Параметры по умолчанию совпадают с настройками графа во фронтенде
+DEFAULT_DISTANCE = 100
+DEFAULT_NODE_RADIUS = 8
+
+LAYOUT_WORKERS = int(os.environ.get("LAYOUT_WORKERS", "2"))
+LAYOUT_ITERATIONS = int(os.environ.get("LAYOUT_ITERATIONS", "300"))
+
+# Сила отталкивания узлов (как forceManyBody в d3) и затухание скорости
+CHARGE = -30.0
+VELOCITY_DECAY = 0.4
+# До этого размера отталкивание и столкновения считаются по всем парам узлов
+EXACT_NODES = int(os.environ.get("LAYOUT_EXACT_NODES", "500"))
+# Сколько строк матрицы попарных расстояний считать за раз, чтобы не держать n x n
+BLOCK_SIZE = 512
+
+
+def topology_hash(node_ids: Iterable[str], links: Iterable[tuple[str, str]]) -> str:
+    """Хэш состава узлов и связей: имена и типы на раскладку не влияют"""
+    digest = hashlib.sha1()
+
+    for node_id in node_ids:
+        digest.update(node_id.encode() + b"\0")
+
+    digest.update(b"\1")
+
+    for source, target in links:
+        digest.update(f"{source}\0{target}\0".encode())
+
+    return digest.hexdigest()
+
+
+def force_layout(
+    count: int,
+    sources: np.ndarray,
+    targets: np.ndarray,
+    distance: float = DEFAULT_DISTANCE,
+    node_radius: float = DEFAULT_NODE_RADIUS,
+    iterations: int = LAYOUT_ITERATIONS,
+) -> np.ndarray:
+    """
+    Силовая раскладка графа по модели d3-force: пружины связей длиной distance,
+    отталкивание узлов и столкновения с радиусом node_radius. sources и targets -
+    индексы концов связей. Возвращает массив координат (count, 2).
+    """
+    if count == 0:
+        return np.zeros((0, 2))
+
+    # Начальная раскладка по спирали, как у d3: результат детерминирован
+    index = np.arange(count)
+    radius = 10 * np.sqrt(0.5 + index)
+    angle = index * np.pi * (3 - np.sqrt(5))
+    position = np.column_stack([radius * np.cos(angle), radius * np.sin(angle)])
+    velocity = np.zeros_like(position)
+
+    degree = np.bincount(sources, minlength=count) + np.bincount(
+        targets, minlength=count
+    )
+    strength = 1 / np.maximum(np.minimum(degree[sources], degree[targets]), 1)
+    bias = degree[sources] / np.maximum(degree[sources] + degree[targets], 1)
+
+    alpha = 1.0
+    alpha_decay = 1 - 0.001 ** (1 / max(iterations, 1))
+    collide = 2 * node_radius
+
+    for _ in range(iterations):
+        alpha -= alpha * alpha_decay
+
+        if len(sources):
+            delta = (position[targets] + velocity[targets]) - (
+                position[sources] + velocity[sources]
+            )
+            length = np.maximum(np.hypot(delta[:, 0], delta[:, 1]), 1e-6)
+            delta *= ((length - distance) / length * alpha * strength)[:, None]
+            np.add.at(velocity, targets, -delta * bias[:, None])
+            np.add.at(velocity, sources, delta * (1 - bias)[:, None])
+
+        if count <= EXACT_NODES:
+            velocity += _repulsion_exact(position, alpha, collide)
+        else:
+            velocity += _repulsion_grid(position, alpha)
+
+        velocity *= 1 - VELOCITY_DECAY
+        position += velocity
+
+    return position - position.mean(axis=0)
+
+
+def _repulsion_exact(position: np.ndarray, alpha: float, collide: float) -> np.ndarray:
+    """Отталкивание и столкновения по всем парам, блоками строк"""
+    x, y = position[:, 0], position[:, 1]
+    result = np.empty_like(position)
+
+    for start in range(0, len(position), BLOCK_SIZE):
+        block = slice(start, start + BLOCK_SIZE)
+        dx = np.subtract.outer(x[block], x)
+        dy = np.subtract.outer(y[block], y)
+        squared = np.maximum(dx * dx + dy * dy, 1)
+        length = np.sqrt(squared)
+
+        force = -CHARGE * alpha / squared
+        # Пересекающиеся узлы расталкиваются независимо от alpha
+        force += np.maximum(collide - length, 0) / length * 0.5
+
+        result[block, 0] = (dx * force).sum(axis=1)
+        result[block, 1] = (dy * force).sum(axis=1)
+
+    return result
+
+
+def _repulsion_grid(position: np.ndarray, alpha: float) -> np.ndarray:
+    """
+    Приближенное отталкивание для больших графов: узлы собираются в ячейки
+    сетки, и каждый узел отталкивается от центров масс ячеек, а не от всех
+    узлов. Столкновения в этом режиме не считаются.
+    """
+    count = len(position)
+    side = max(int(np.sqrt(2 * np.sqrt(count))), 1)
+
+    low = position.min(axis=0)
+    size = np.maximum(position.max(axis=0) - low, 1e-6) / side
+    cell = np.minimum(((position - low) / size).astype(np.intp), side - 1)
+    cell = cell[:, 0] * side + cell[:, 1]
+
+    mass = np.bincount(cell, minlength=side * side)
+    filled = mass > 0
+    mass = mass[filled]
+    cx = np.bincount(cell, position[:, 0], side * side)[filled] / mass
+    cy = np.bincount(cell, position[:, 1], side * side)[filled] / mass
+
+    result = np.empty_like(position)
+
+    for start in range(0, count, BLOCK_SIZE):
+        block = slice(start, start + BLOCK_SIZE)
+        dx = np.subtract.outer(position[block, 0], cx)
+        dy = np.subtract.outer(position[block, 1], cy)
+        force = -CHARGE * alpha * mass / np.maximum(dx * dx + dy * dy, 1)
+
+        result[block, 0] = (dx * force).sum(axis=1)
+        result[block, 1] = (dy * force).sum(axis=1)
+
+    return result
+
+
+class LayoutCache:
+    """
+    Кэш раскладок в памяти процесса. Расчет идет в пуле процессов, чтобы не
+    занимать GIL воркера API, а одновременные запросы одной раскладки ждут
+    общий расчет.
+    """
+
+    def __init__(self, maxsize: int = 64, workers: int = LAYOUT_WORKERS):
+        self.maxsize = maxsize
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[Hashable, np.ndarray] = OrderedDict()
+        self._pending: dict[Hashable, Future] = {}
+        self._executor: ProcessPoolExecutor | None = None
+
+    async def get(
+        self,
+        key: Hashable,
+        count: int,
+        sources: np.ndarray,
+        targets: np.ndarray,
+        distance: float,
+        node_radius: float,
+    ) -> np.ndarray:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+            future = self._pending.get(key)
+            submitted = future is None
+
+            if submitted:
+                future = self._pool().submit(
+                    force_layout, count, sources, targets, distance, node_radius
+                )
+                self._pending[key] = future
+
+        if submitted:
+            future.add_done_callback(lambda done: self._store(key, done))
+
+        return await asyncio.wrap_future(future)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: дочерние процессы не наследуют потоки и соединения с БД
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+
+        return self._executor
+
+    def _store(self, key: Hashable, future: Future) -> None:
+        with self._lock:
+            self._pending.pop(key, None)
+
+            if future.cancelled() or future.exception() is not None:
+                return
+
+            self._entries[key] = future.result()
+
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+
+section_layouts = LayoutCache()
@@ -0,0 +1,193 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+# Монитор включается явно: поток-наблюдатель и снимки стека не бесплатны
+LOOP_MONITOR = os.environ.get("LOOP_MONITOR", "0") == "1"
+# Блокировка цикла событий дольше порога считается зависанием
+LOOP_STALL_THRESHOLD_MS = float(os.environ.get("LOOP_STALL_THRESHOLD_MS", "100"))
+# Сколько последних зависаний хранить для /diagnostics/loop-stalls
+LOOP_STALL_HISTORY = int(os.environ.get("LOOP_STALL_HISTORY", "100"))
+STACK_LIMIT = 30
+
+
+class LoopMonitor:
+    """
+    Поиск блокировок цикла событий. Цикл раз в interval отмечает
+    пульс, поток-наблюдатель проверяет его и, если пульса нет дольше
+    порога, снимает стек потока цикла - это код, который блокирует цикл,
+    и запоминает маршрут текущей задачи. Длительность зависания известна,
+    когда цикл освобождается и отмечает следующий пульс.
+    """
+
+    def __init__(
+        self,
+        threshold_ms: float = LOOP_STALL_THRESHOLD_MS,
+        history: int = LOOP_STALL_HISTORY,
+    ):
+        self.threshold = threshold_ms / 1000
+        self.interval = self.threshold / 4
+        self.stalls: deque[dict] = deque(maxlen=history)
+        self.stalls_total = 0
+        self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread: int | None = None
+        self._beat = 0.0
+        self._sample: tuple[float, dict] | None = None
+        self._stopped = threading.Event()
+        # Задача запроса -> scope, маршрут в scope появляется после роутинга
+        self._requests: dict[asyncio.Task, Scope] = {}
+
+    @property
+    def running(self) -> bool:
+        return self._loop is not None
+
+    def start(self) -> None:
+        if self.running:
+            return
+
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stopped.clear()
+        self._loop.call_later(self.interval, self._heartbeat)
+        threading.Thread(
+            target=self._watch, name="loop-monitor", daemon=True
+        ).start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._loop = None
+
+    def _heartbeat(self) -> None:
+        if self._stopped.is_set():
+            return
+
+        now = time.monotonic()
+        # Задержка пульса сверх расписания - время, пока цикл был занят
+        delay = now - self._beat - self.interval
+
+        with self._lock:
+            sample, self._sample = self._sample, None
+            self._beat = now
+
+        if delay > self.threshold:
+            self._record(delay, sample[1] if sample else {})
+
+        self._loop.call_later(self.interval, self._heartbeat)
+
+    def _watch(self) -> None:
+        while not self._stopped.wait(self.interval):
+            with self._lock:
+                beat = self._beat
+                sampled = self._sample is not None and self._sample[0] == beat
+
+            if sampled or time.monotonic() - beat - self.interval < self.threshold:
+                continue
+
+            sample = self._take_sample()
+
+            with self._lock:
+                # Цикл мог освободиться, пока снимался стек
+                if self._beat == beat:
+                    self._sample = (beat, sample)
+
+    def _take_sample(self) -> dict:
+        frame = sys._current_frames().get(self._loop_thread)
+        stack = traceback.format_stack(frame, limit=STACK_LIMIT) if frame else []
+        scope = None
+
+        try:
+            task = asyncio.current_task(self._loop)
+        except RuntimeError:
+            task = None
+
+        if task is not None:
+            scope = self._requests.get(task)
+
+        return {
+            "route": route_name(scope) if scope is not None else None,
+            "stack": "".join(stack),
+        }
+
+    def _record(self, delay: float, sample: dict) -> None:
+        stall = {
+            "route": sample.get("route"),
+            "duration_ms": round(delay * 1000, 1),
+            "detected_at": time.time(),
+            "stack": sample.get("stack", ""),
+        }
+
+        with self._lock:
+            self.stalls.append(stall)
+            self.stalls_total += 1
+
+        logger.warning(
+            "Цикл событий заблокирован на %.0f мс, маршрут %s\n%s",
+            stall["duration_ms"],
+            stall["route"] or "-",
+            stall["stack"],
+        )
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            stalls = list(reversed(self.stalls))
+            total = self.stalls_total
+
+        return {
+            "enabled": self.running,
+            "threshold_ms": self.threshold * 1000,
+            "stalls_total": total,
+            "stalls": stalls,
+        }
+
+    def track(self, scope: Scope) -> asyncio.Task | None:
+        task = asyncio.current_task()
+
+        if task is not None:
+            self._requests[task] = scope
+
+        return task
+
+    def untrack(self, task: asyncio.Task | None) -> None:
+        if task is not None:
+            self._requests.pop(task, None)
+
+
+def route_name(scope: Scope) -> str:
+    route = scope.get("route")
+    path = getattr(route, "path", None) or scope.get("path", "")
+
+    return f"{scope.get('method', '')} {path}".strip()
+
+
+class LoopMonitorMiddleware:
+    """Связывает задачу запроса с маршрутом для отчетов LoopMonitor"""
+
+    def __init__(self, app: ASGIApp, monitor: LoopMonitor | None = None):
+        self.app = app
+        self.monitor = monitor if monitor is not None else loop_monitor
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        task = self.monitor.track(scope)
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.monitor.untrack(task)
+
+
+loop_monitor = LoopMonitor()
@@ -160,6 +160,8 @@ class Section(Base):
     name = mapped_column(String, nullable=False)
     description = mapped_column(String, nullable=True)
     dt_create = mapped_column(DateTime, default=func.now(), nullable=False)
+    # Граф раздела публикуется статическим файлом для просмотра без входа
+    is_public = mapped_column(Boolean, default=False, nullable=False)
 
     user_id = mapped_column(Integer, ForeignKey("users.id"), nullable=True)
     user: Mapped[User] = relationship("User", back_populates="sections")
@@ -223,4 +225,47 @@ class Node(Base):
         UniqueConstraint(
             "name", "type_id", name="uq__nodes__name_type_id"
         ),
-    )
\ No newline at end of file
+    )
+
+class NodeChange(Base):
+    """
+    Журнал изменений узлов и связей раздела для дельта-синхронизации.
+    version - номер изменения внутри раздела из SectionVersion: без пропусков
+    и в порядке коммитов, в отличие от id.
+    """
+
+    __tablename__ = "node_changes"
+
+    id = mapped_column(Integer, primary_key=True, index=True)
+    section_id = mapped_column(
+        Integer, ForeignKey("sections.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    version = mapped_column(Integer, nullable=False)
+    entity = mapped_column(String, nullable=False)
+    action = mapped_column(String, nullable=False)
+    node_id = mapped_column(Integer, nullable=False)
+    node2_id = mapped_column(Integer, nullable=True)
+    dt_create = mapped_column(DateTime, default=func.now(), nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint(
+            "section_id", "version", name="uq__node_changes__section_id_version"
+        ),
+    )
+
+
+class SectionVersion(Base):
+    """
+    Счетчик версий журнала раздела. Строка блокируется до конца транзакции,
+    которая пишет в журнал, поэтому версии раздела выдаются по одной и
+    становятся видны в порядке возрастания. compacted_to - версия, до
+    которой журнал уже удален.
+    """
+
+    __tablename__ = "section_versions"
+
+    section_id = mapped_column(
+        Integer, ForeignKey("sections.id", ondelete="CASCADE"), primary_key=True
+    )
+    version = mapped_column(Integer, default=0, nullable=False)
+    compacted_to = mapped_column(Integer, default=0, nullable=False)
@@ -0,0 +1,106 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, TypeVar
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+T = TypeVar("T")
+
+# Хэширование паролей
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+# Потоки для bcrypt и сколько вызовов может ждать свободный поток
+PASSWORD_WORKERS = int(os.environ.get("PASSWORD_WORKERS", "2"))
+PASSWORD_QUEUE_LIMIT = int(os.environ.get("PASSWORD_QUEUE_LIMIT", "64"))
+
+
+class PasswordHasher:
+    """
+    Хэширование и проверка паролей в отдельном пуле потоков: bcrypt
+    отпускает GIL, поэтому не блокирует цикл событий и не занимает пул
+    потоков синхронных маршрутов. Если очередь длиннее queue_limit, вызов
+    сразу получает 503, а не ждет вместе со всеми.
+    """
+
+    def __init__(
+        self, workers: int = PASSWORD_WORKERS, queue_limit: int = PASSWORD_QUEUE_LIMIT
+    ):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self.max_queued = 0
+        self.completed = 0
+        self.rejected = 0
+        self.time_total = 0.0
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="passwords"
+        )
+
+    async def hash(self, password: str) -> str:
+        return await self._run(pwd_context.hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._run(pwd_context.verify, password, hashed_password)
+
+    async def _run(self, func: Callable[..., T], *args) -> T:
+        with self._lock:
+            # Вызовы сверх числа потоков ждут в очереди пула
+            queued = max(self._pending - self.workers, 0)
+
+            if queued >= self.queue_limit:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=503,
+                    detail="Too many authentication requests",
+                    headers={"Retry-After": "1"},
+                )
+
+            self._pending += 1
+            self.max_queued = max(self.max_queued, self._pending - self.workers)
+
+        loop = asyncio.get_running_loop()
+
+        try:
+            return await loop.run_in_executor(self._executor, self._call, func, args)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def _call(self, func: Callable[..., T], args: tuple) -> T:
+        started = time.perf_counter()
+
+        with self._lock:
+            self._running += 1
+
+        try:
+            return func(*args)
+        finally:
+            with self._lock:
+                self._running -= 1
+                self.completed += 1
+                self.time_total += time.perf_counter() - started
+
+    def stats(self) -> dict:
+        with self._lock:
+            completed = self.completed
+            average = self.time_total / completed if completed else 0.0
+
+            return {
+                "workers": self.workers,
+                "queue_limit": self.queue_limit,
+                "running": self._running,
+                "queued": max(self._pending - self.workers, 0),
+                "max_queued": self.max_queued,
+                "completed": completed,
+                "rejected": self.rejected,
+                "time_avg_ms": round(average * 1000, 1),
+            }
+
+
+password_hasher = PasswordHasher()
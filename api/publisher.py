@@ -0,0 +1,118 @@
+import gzip
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from api.db import BackgroundSessionLocal
+from api.models import Section
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Каталог, который nginx отдает как /api/public/graph/section/<id>
+PUBLIC_GRAPH_DIR = os.environ.get("PUBLIC_GRAPH_DIR", "public_graph")
+
+
+class SnapshotPublisher:
+    """
+    Пишет граф публичного раздела в файлы <id>.json, <id>.json.gz и
+    <id>.json.br (если установлен brotli), чтобы nginx отдавал их без API.
+
+    Публикация идет в одном фоновом потоке: частые изменения раздела
+    схлопываются в одну пересборку. Файлы заменяются атомарно.
+    """
+
+    def __init__(self, directory: str, build: Callable[[Session, int], bytes]):
+        self.directory = directory
+        self.build = build
+        self._lock = threading.Lock()
+        self._pending: set[int] = set()
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="graph-publisher"
+        )
+
+    def schedule(self, section_id: int) -> None:
+        with self._lock:
+            if section_id in self._pending:
+                return
+            self._pending.add(section_id)
+
+        self._executor.submit(self._run, section_id)
+
+    def publish_all(self) -> None:
+        """Публикует все публичные разделы и убирает файлы остальных"""
+        try:
+            with BackgroundSessionLocal() as db:
+                public = set(db.scalars(select(Section.id).where(Section.is_public)))
+        except Exception:
+            logger.exception("Не удалось получить список публичных разделов")
+            return
+
+        published = set()
+
+        if os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                section_id = name.split(".", 1)[0]
+                if section_id.isdigit():
+                    published.add(int(section_id))
+
+        for section_id in public | published:
+            self.schedule(section_id)
+
+    def publish(self, db: Session, section_id: int) -> None:
+        section = db.get(Section, section_id)
+
+        if section is None or not section.is_public:
+            self.remove(section_id)
+            return
+
+        data = self.build(db, section_id)
+        os.makedirs(self.directory, exist_ok=True)
+
+        # json пишется последним: сжатые версии не старше исходной
+        self._write(f"{section_id}.json.gz", gzip.compress(data, 9, mtime=0))
+
+        if brotli is not None:
+            self._write(f"{section_id}.json.br", brotli.compress(data))
+
+        self._write(f"{section_id}.json", data)
+
+    def remove(self, section_id: int) -> None:
+        for suffix in (".json", ".json.gz", ".json.br"):
+            try:
+                os.remove(os.path.join(self.directory, f"{section_id}{suffix}"))
+            except FileNotFoundError:
+                pass
+
+    def _run(self, section_id: int) -> None:
+        # Изменения, пришедшие во время сборки, запланируют ее заново
+        with self._lock:
+            self._pending.discard(section_id)
+
+        try:
+            with BackgroundSessionLocal() as db:
+                self.publish(db, section_id)
+        except Exception:
+            logger.exception("Не удалось опубликовать граф раздела %s", section_id)
+
+    def _write(self, name: str, data: bytes) -> None:
+        fd, path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(data)
+            os.chmod(path, 0o644)
+            os.replace(path, os.path.join(self.directory, name))
+        except BaseException:
+            os.remove(path)
+            raise
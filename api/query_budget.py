@@ -0,0 +1,77 @@
+import logging
+import os
+from contextvars import ContextVar
+
+from fastapi import Depends, Request
+from sqlalchemy import event
+
+from api.db import async_engine, async_replica_engine, engine, replica_engine
+
+logger = logging.getLogger(__name__)
+
+# В строгом режиме запрос сверх бюджета падает с ошибкой, иначе только пишется в лог
+QUERY_BUDGET_STRICT = os.environ.get("QUERY_BUDGET_STRICT", "0") == "1"
+
+
+class QueryBudgetExceeded(Exception): ...
+
+
+class QueryCounter:
+    def __init__(self, route: str, limit: int):
+        self.route = route
+        self.limit = limit
+        self.count = 0
+        self.active = True
+
+
+_counter: ContextVar[QueryCounter | None] = ContextVar("query_counter", default=None)
+
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    counter = _counter.get()
+
+    if counter is None or not counter.active:
+        return
+
+    counter.count += 1
+
+    if counter.count <= counter.limit:
+        return
+
+    message = (
+        f"{counter.route}: запрос {counter.count} при бюджете {counter.limit}"
+    )
+
+    if QUERY_BUDGET_STRICT:
+        raise QueryBudgetExceeded(f"{message}\n{statement}")
+
+    if counter.count == counter.limit + 1:
+        logger.warning("%s\n%s", message, statement)
+
+
+# Без реплики ее движки совпадают с основными, слушатель вешается один раз
+for _engine in {
+    engine,
+    replica_engine,
+    async_engine.sync_engine,
+    async_replica_engine.sync_engine,
+}:
+    event.listen(_engine, "before_cursor_execute", _count_query)
+
+
+def query_budget(limit: int):
+    """
+    Зависимость с бюджетом SQL-запросов на маршрут, включая проверку токена.
+    Ленивые загрузки при сериализации ответа тоже считаются.
+    """
+
+    async def dependency(request: Request):
+        counter = QueryCounter(request.url.path, limit)
+        _counter.set(counter)
+
+        try:
+            yield counter
+        finally:
+            counter.active = False
+
+    return Depends(dependency)
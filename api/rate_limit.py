@@ -0,0 +1,94 @@
+import ipaddress
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from fastapi import Depends, HTTPException, Request
+
+# Запросов в минуту с одного адреса к публичным маршрутам и допустимый всплеск
+PUBLIC_RATE_LIMIT = float(os.environ.get("PUBLIC_RATE_LIMIT", "60"))
+PUBLIC_RATE_BURST = int(os.environ.get("PUBLIC_RATE_BURST", "20"))
+# Адреса и подсети прокси, которым можно верить в X-Real-IP, через запятую
+TRUSTED_PROXIES = [
+    ipaddress.ip_network(proxy.strip(), strict=False)
+    for proxy in os.environ.get("TRUSTED_PROXIES", "127.0.0.1,::1").split(",")
+    if proxy.strip()
+]
+
+
+class RateLimiter:
+    """
+    Ограничение частоты запросов по алгоритму token bucket для каждого клиента.
+    Хранит не больше max_clients корзин, давно не приходившие клиенты
+    вытесняются первыми.
+    """
+
+    def __init__(self, per_minute: float, burst: int, max_clients: int = 10000):
+        self.rate = per_minute / 60
+        self.burst = burst
+        self.max_clients = max_clients
+        self._lock = threading.Lock()
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    def hit(self, client: str) -> float:
+        """0, если запрос можно выполнить, иначе сколько секунд подождать"""
+        now = time.monotonic()
+
+        with self._lock:
+            tokens, updated = self._buckets.pop(client, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+            else:
+                wait = (1 - tokens) / self.rate
+
+            self._buckets[client] = (tokens, now)
+
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+
+        return wait
+
+
+def trusted_proxy(host: str) -> bool:
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+
+    return any(address in network for network in TRUSTED_PROXIES)
+
+
+def client_address(request: Request) -> str:
+    host = request.client.host if request.client else ""
+    # За nginx адрес клиента приходит в X-Real-IP. От остальных заголовок не
+    # принимается, иначе клиент обходил бы лимит, меняя его в каждом запросе
+    real_ip = request.headers.get("x-real-ip")
+
+    if real_ip and trusted_proxy(host):
+        return real_ip
+
+    return host
+
+
+def rate_limit(limiter: RateLimiter):
+    """Зависимость, отвечающая 429 с Retry-After при превышении лимита"""
+
+    def dependency(request: Request) -> None:
+        wait = limiter.hit(client_address(request))
+
+        if wait:
+            raise HTTPException(
+                status_code=429,
+                detail="Too many requests",
+                headers={"Retry-After": str(math.ceil(wait))},
+            )
+
+    return Depends(dependency)
+
+
+public_rate_limiter = RateLimiter(PUBLIC_RATE_LIMIT, PUBLIC_RATE_BURST)
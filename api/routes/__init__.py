@@ -1,5 +1,7 @@
+from .analytics import app
 from .config import app
 from .departments import app
+from .diagnostics import app
 from .employee import app
 from .graph import app
 from .node_types import app
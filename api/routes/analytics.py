@@ -0,0 +1,230 @@
+import os
+import numpy as np
+from fastapi import Depends, HTTPException, Query, Request, Response
+from sqlalchemy.orm import Session
+from api.analytics import (
+    BETWEENNESS_SAMPLES,
+    CSRGraph,
+    GraphMetrics,
+    PathTimeout,
+    analyze,
+    build_csr,
+    edge_link,
+    shortest_path,
+)
+from api.auth import app
+from api.cache import EMPLOYEE_GRAPH, graph_cache, graph_versions, section_key
+from api.query_budget import query_budget
+from api.routes.graph import (
+    cached_graph,
+    iter_graph_rows,
+    iter_section_graph_rows,
+    section_from_path,
+)
+from api.routes_helpers import (
+    RequestContext,
+    conditional,
+    get_context,
+)
+from api.schemas import (
+    GraphAnalyticsSchema,
+    GraphDataSchema,
+    GraphMetricSchema,
+    LinkSchema,
+    NodeSchema,
+)
+
+# Проверка токена и выгрузка графа при пересборке снапшота
+ANALYTICS_BUDGET = query_budget(4)
+# Ограничения поиска пути между узлами
+PATH_MAX_HOPS = 12
+PATH_TIMEOUT_SECONDS = float(os.environ.get("PATH_TIMEOUT_SECONDS", "2"))
+
+
+def _top(graph: CSRGraph, values: np.ndarray, top: int) -> list[GraphMetricSchema]:
+    order = np.argsort(-values, kind="stable")[:top]
+
+    return [
+        GraphMetricSchema(
+            id=graph.nodes[i]["id"], name=graph.nodes[i]["name"], value=values[i]
+        )
+        for i in order.tolist()
+    ]
+
+
+def analytics_response(metrics: GraphMetrics, top: int) -> GraphAnalyticsSchema:
+    graph = metrics.graph
+    sizes = np.bincount(metrics.components)
+
+    return GraphAnalyticsSchema(
+        nodes=graph.size,
+        links=len(graph.indices) // 2,
+        degree_distribution=np.bincount(metrics.degree).tolist(),
+        components=len(sizes),
+        largest_component=int(sizes.max(initial=0)),
+        top_degree=_top(graph, metrics.degree.astype(float), top),
+        top_pagerank=_top(graph, metrics.pagerank, top),
+        top_eigenvector=_top(graph, metrics.eigenvector, top),
+        top_betweenness=_top(graph, metrics.betweenness, top),
+    )
+
+
+def csr_graph(key, db: Session, build_rows) -> CSRGraph:
+    """Матрица смежности графа из кэша снапшотов"""
+    return graph_cache.get(key, db, lambda db: build_csr(build_rows(db)), "csr")
+
+
+def path_response(
+    graph: CSRGraph, source: str, target: str, max_hops: int
+) -> GraphDataSchema:
+    """
+    Узлы пути по порядку от source к target и связи между ними с теми же id
+    и направлением, что в графе
+    """
+    if source not in graph.index or target not in graph.index:
+        raise HTTPException(status_code=404, detail="Node not found")
+
+    try:
+        path = shortest_path(
+            graph,
+            graph.index[source],
+            graph.index[target],
+            max_hops,
+            PATH_TIMEOUT_SECONDS,
+        )
+    except PathTimeout:
+        raise HTTPException(status_code=504, detail="Path search timed out")
+
+    if path is None:
+        raise HTTPException(status_code=404, detail="Path not found")
+
+    return GraphDataSchema(
+        nodes=[NodeSchema(**graph.nodes[i]) for i in path],
+        links=[LinkSchema(**edge_link(graph, a, b)) for a, b in zip(path, path[1:])],
+    )
+
+
+def graph_metrics(
+    request: Request,
+    response: Response,
+    key,
+    db: Session,
+    build_rows,
+    samples: int,
+) -> GraphMetrics:
+    """
+    Метрики по снапшоту CSR. И матрица смежности, и метрики кэшируются по
+    версии графа, поэтому при неизменном графе считаются один раз.
+    """
+
+    def build_graph(db: Session) -> CSRGraph:
+        return build_csr(build_rows(db))
+
+    def build(db: Session) -> GraphMetrics:
+        entry = graph_cache.get_entry(key, db, build_graph, "csr")
+        # Устаревшая матрица дала бы метрики прошлой версии под новой меткой
+        if entry.version != graph_versions.get(key):
+            return analyze(build_graph(db), samples)
+
+        return analyze(entry.value, samples)
+
+    return cached_graph(request, response, key, db, build, ("analytics", samples))
+
+
+@app.get(
+    "/graph/analytics",
+    response_model=GraphAnalyticsSchema,
+    tags=["graph"],
+    dependencies=[conditional(EMPLOYEE_GRAPH, vary=("accept",)), ANALYTICS_BUDGET],
+)
+def get_graph_analytics(
+    request: Request,
+    response: Response,
+    top: int = Query(10, ge=1, le=1000),
+    samples: int = Query(BETWEENNESS_SAMPLES, ge=1, le=1024),
+    ctx: RequestContext = Depends(get_context),
+):
+    """
+    Степени, компоненты связности, PageRank, центральность по собственному
+    вектору и приближенная посредническая центральность графа сотрудников.
+    samples - число источников BFS для посреднической центральности.
+    """
+    metrics = graph_metrics(
+        request, response, EMPLOYEE_GRAPH, ctx.db, iter_graph_rows, samples
+    )
+
+    return analytics_response(metrics, top)
+
+
+@app.get(
+    "/graph/section/{section_id}/analytics",
+    response_model=GraphAnalyticsSchema,
+    tags=["graph"],
+    dependencies=[
+        conditional(section_from_path, vary=("accept",)),
+        ANALYTICS_BUDGET,
+    ],
+)
+def get_graph_section_analytics(
+    section_id: int,
+    request: Request,
+    response: Response,
+    top: int = Query(10, ge=1, le=1000),
+    samples: int = Query(BETWEENNESS_SAMPLES, ge=1, le=1024),
+    ctx: RequestContext = Depends(get_context),
+):
+    """Метрики графа узлов раздела, как у /graph/analytics"""
+    metrics = graph_metrics(
+        request,
+        response,
+        section_key(section_id),
+        ctx.db,
+        lambda db: iter_section_graph_rows(db, section_id),
+        samples,
+    )
+
+    return analytics_response(metrics, top)
+
+
+@app.get(
+    "/graph/path",
+    response_model=GraphDataSchema,
+    tags=["graph"],
+    dependencies=[ANALYTICS_BUDGET],
+)
+def get_graph_path(
+    source: str,
+    target: str,
+    max_hops: int = Query(6, ge=1, le=PATH_MAX_HOPS),
+    ctx: RequestContext = Depends(get_context),
+):
+    """
+    Кратчайшая цепочка связей между узлами графа сотрудников, например
+    от сотрудника (uuid) до проекта (project-<id>). Связи без направления.
+    """
+    graph = csr_graph(EMPLOYEE_GRAPH, ctx.db, iter_graph_rows)
+
+    return path_response(graph, source, target, max_hops)
+
+
+@app.get(
+    "/graph/section/{section_id}/path",
+    response_model=GraphDataSchema,
+    tags=["graph"],
+    dependencies=[ANALYTICS_BUDGET],
+)
+def get_graph_section_path(
+    section_id: int,
+    source: int,
+    target: int,
+    max_hops: int = Query(6, ge=1, le=PATH_MAX_HOPS),
+    ctx: RequestContext = Depends(get_context),
+):
+    """Кратчайшая цепочка связей между узлами раздела"""
+    graph = csr_graph(
+        section_key(section_id),
+        ctx.db,
+        lambda db: iter_section_graph_rows(db, section_id),
+    )
+
+    return path_response(graph, f"node-{source}", f"node-{target}", max_hops)
@@ -1,7 +1,9 @@
 from fastapi import Depends, HTTPException, Request
-from sqlalchemy.orm import Session
-from api.db import get_db
-from api.auth import app, check_token, oauth2_scheme
+from sqlalchemy.ext.asyncio import AsyncSession
+from api.db import get_async_db
+from api.auth import app, check_token_async, oauth2_scheme
+from api.cache import table_key
+from api.routes_helpers import conditional
 from api.schemas import (
     ConfigNodesSchema,
 )
@@ -12,10 +14,12 @@ from api.crud import (
 
 @app.post("/config/nodes", tags=["config"])
 async def update_config_nodes(
-    data: ConfigNodesSchema, request: Request, db: Session = Depends(get_db)
+    data: ConfigNodesSchema,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
 ):
     try:
-        user = check_token(await oauth2_scheme(request), db)
+        user = await check_token_async(await oauth2_scheme(request), db)
     except HTTPException:
         user = None
 
@@ -49,24 +53,36 @@ async def update_config_nodes(
     ]
 
     for item in data:
-        config_crud.update(db=db, user_id=user_id, **item)
+        await config_crud.update_async(db, user_id=user_id, **item)
 
 
-@app.get("/config/nodes", response_model=ConfigNodesSchema, tags=["config"])
+# Настройки зависят от пользователя, поэтому ETag учитывает токен. Токен
+# необязателен: без него отдаются общие настройки
+CONFIG_CONDITIONAL = conditional(
+    table_key("config"), vary=("authorization",), public=True
+)
+
+
+@app.get(
+    "/config/nodes",
+    response_model=ConfigNodesSchema,
+    tags=["config"],
+    dependencies=[CONFIG_CONDITIONAL],
+)
 async def get_config_nodes(
     request: Request, 
-    db: Session = Depends(get_db), 
+    db: AsyncSession = Depends(get_async_db), 
     section_id: int | None = None
 ):
     try:
-        user = check_token(await oauth2_scheme(request), db)
+        user = await check_token_async(await oauth2_scheme(request), db)
     except HTTPException:
         user = None
 
     user_id = user.id if user else None
 
-    config = config_crud.get(
-        db=db, 
+    config = await config_crud.get_async(
+        db, 
         name="nodes", 
         key=None, 
         user_id=user_id, 
@@ -92,10 +108,11 @@ async def get_config_nodes(
     "/config/nodes/section/{section_id}",
     response_model=ConfigNodesSchema,
     tags=["config"],
+    dependencies=[CONFIG_CONDITIONAL],
 )
 async def get_config_nodes_by_section_id(
     section_id: int, 
     request: Request, 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     return await get_config_nodes(section_id=section_id, request=request, db=db)
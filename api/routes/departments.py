@@ -1,10 +1,13 @@
 from typing import List
-from fastapi import Depends, HTTPException
+from fastapi import Depends, HTTPException, Request, Response
 from api.auth import app
+from api.cache import table_key
 from api.routes_helpers import (
     RequestContext,
+    conditional,
     get_context,
 )
+from api.serializers import rows_response
 from api.schemas import (
     DepartmentCreate,
     DepartmentRead,
@@ -29,11 +32,22 @@ def create_department(
     return department_crud.create(ctx.db, data)
 
 
-@app.get("/departments/", response_model=List[DepartmentRead], tags=["departments"])
+@app.get(
+    "/departments/",
+    response_model=List[DepartmentRead],
+    tags=["departments"],
+    dependencies=[conditional(table_key("departments"), vary=("accept",))],
+)
 def get_departments(
-    skip: int = 0, limit: int = 250, ctx: RequestContext = Depends(get_context)
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 250,
+    ctx: RequestContext = Depends(get_context),
 ):
-    return department_crud.get_all(ctx.db, skip, limit)
+    rows = department_crud.read_rows(ctx.db, skip=skip, limit=limit)
+
+    return rows_response(request, rows, response.headers)
 
 
 @app.get("/departments/{id}", response_model=DepartmentRead, tags=["departments"])
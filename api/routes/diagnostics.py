@@ -0,0 +1,43 @@
+import os
+
+from fastapi import Depends
+
+from api.auth import app, check_token_async
+from api.db import pool_stats
+from api.loop_monitor import LOOP_MONITOR, loop_monitor
+from api.passwords import password_hasher
+from api.schemas import DbPoolStatsSchema, LoopStallsSchema, PasswordPoolStatsSchema
+
+# Маршруты отдают стеки кода и состояние пулов, а токен может получить любой
+# через /register, поэтому они подключаются явно, по умолчанию вместе с
+# монитором цикла событий
+DIAGNOSTICS = os.environ.get("DIAGNOSTICS", "1" if LOOP_MONITOR else "0") == "1"
+
+if DIAGNOSTICS:
+
+    @app.get(
+        "/diagnostics/loop-stalls",
+        response_model=LoopStallsSchema,
+        tags=["diagnostics"],
+        dependencies=[Depends(check_token_async)],
+    )
+    async def get_loop_stalls():
+        return loop_monitor.snapshot()
+
+    @app.get(
+        "/diagnostics/db-pool",
+        response_model=DbPoolStatsSchema,
+        tags=["diagnostics"],
+        dependencies=[Depends(check_token_async)],
+    )
+    async def get_db_pool_stats():
+        return pool_stats()
+
+    @app.get(
+        "/diagnostics/passwords",
+        response_model=PasswordPoolStatsSchema,
+        tags=["diagnostics"],
+        dependencies=[Depends(check_token_async)],
+    )
+    async def get_password_pool_stats():
+        return password_hasher.stats()
@@ -1,11 +1,12 @@
 from typing import List
 import uuid
-from fastapi import Depends
+from fastapi import Depends, Request
 from api.auth import app
 from api.routes_helpers import (
     RequestContext,
     get_context,
 )
+from api.serializers import rows_response
 from api.schemas import (
     EmployeeCreate,
     EmployeeRead,
@@ -36,9 +37,14 @@ def create_employee(data: EmployeeCreate, ctx: RequestContext = Depends(get_cont
 
 @app.get("/employee/", response_model=List[EmployeeRead], tags=["employee"])
 def get_employees(
-    skip: int = 0, limit: int = 250, ctx: RequestContext = Depends(get_context)
+    request: Request,
+    skip: int = 0,
+    limit: int = 250,
+    ctx: RequestContext = Depends(get_context),
 ):
-    return employee_crud.get_all(ctx.db, skip, limit)
+    rows = employee_crud.read_rows(ctx.db, skip=skip, limit=limit)
+
+    return rows_response(request, rows)
 
 
 @app.get("/employee/{uuid}", response_model=EmployeeRead, tags=["employee"])
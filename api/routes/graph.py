@@ -1,10 +1,41 @@
-from typing import List
-from fastapi import Depends
-from sqlalchemy import select
+import asyncio
+import base64
+import binascii
+import json
+import os
+from typing import Callable, Iterator, NamedTuple
+import numpy as np
+from fastapi import Depends, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import String, case, cast, func, literal, select, tuple_, union_all
+from sqlalchemy.orm import Session, aliased
 from api.auth import app
+from api.cache import (
+    EMPLOYEE_GRAPH,
+    graph_cache,
+    graph_versions,
+    section_key,
+    table_key,
+)
+from api.db import StreamSessionLocal
+from api.events import section_events
+from api.layout import (
+    DEFAULT_DISTANCE,
+    DEFAULT_NODE_RADIUS,
+    section_layouts,
+    topology_hash,
+)
+from api.publisher import PUBLIC_GRAPH_DIR, SnapshotPublisher
+from api.query_budget import query_budget
+from api.rate_limit import public_rate_limiter, rate_limit
 from api.models import (
+    Department,
+    Employee,
     Node,
     NodeType,
+    Position,
+    Project,
     employee_department,
     employee_employee,
     employee_position,
@@ -14,148 +45,1185 @@ from api.models import (
 from api.routes_helpers import (
     RequestContext,
     RequestPubContext,
+    conditional,
     get_context,
     get_pub_context,
+    get_stream_context,
+    make_etag,
 )
+from api.serializers import MSGPACK_MEDIA_TYPE, accepts_msgpack, encode_msgpack
 from api.schemas import (
+    CompactGraphSchema,
+    GraphChangesSchema,
     GraphDataSchema,
+    GraphDetail,
+    GraphFormat,
+    GraphLinksPageSchema,
+    GraphNodesPageSchema,
+    GraphNodeTypeSchema,
+    LayoutGraphSchema,
     LinkSchema,
     NodeSchema,
+    SummaryGraphSchema,
 )
 from api.crud import (
-    department_crud,
+    config_crud,
     employee_crud,
-    position_crud,
-    project_crud,
+    node_change_crud,
     node_crud,
 )
 
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+# Интервал комментариев-пингов в потоке событий, чтобы прокси не рвали соединение
+SSE_HEARTBEAT_SECONDS = 15
+# Сколько строк забирать с серверного курсора и отправлять одним куском
+STREAM_CHUNK_SIZE = 1000
+# Ограничения выборки окрестности узла
+NEIGHBORHOOD_MAX_DEPTH = 6
+NEIGHBORHOOD_MAX_NODES = 5000
+# Сколько секунд публичный граф отдается из кэша без пересборки после изменений
+PUBLIC_GRAPH_TTL = float(os.environ.get("PUBLIC_GRAPH_TTL", "5"))
+# Размер части при постраничной загрузке графа раздела
+CHUNK_DEFAULT_SIZE = 1000
+CHUNK_MAX_SIZE = 10000
+
+GraphRows = Iterator[tuple[str, dict]]
+
+# Проверка токена и один запрос UNION ALL
+GRAPH_BUDGET = query_budget(3)
+# Проверка токена, узлы и связи раздела, настройки раскладки пользователя и общие
+SECTION_GRAPH_BUDGET = query_budget(6)
+
+
+def resolve_format(request: Request, format: GraphFormat | None) -> GraphFormat:
+    """Формат ответа: явный параметр запроса, иначе заголовок Accept"""
+    if format is not None:
+        return format
+
+    if NDJSON_MEDIA_TYPE in request.headers.get("accept", ""):
+        return GraphFormat.ndjson
+
+    if accepts_msgpack(request):
+        return GraphFormat.msgpack
+
+    return GraphFormat.json
+
+
+def cached_graph(
+    request: Request,
+    response: Response,
+    key,
+    db: Session,
+    build: Callable[[Session], object],
+    variant=None,
+    ttl: float | None = None,
+    media_type: str = "application/json",
+):
+    """
+    Снапшот графа из кэша. ETag считается по версии отданного снапшота: если
+    отдан устаревший, следующий запрос получит свежие данные, а не 304.
+    """
+    entry = graph_cache.get_entry(key, db, build, variant, ttl)
+    etag = make_etag(request, entry.version, vary=("accept",))
+
+    # Закодированный снапшот отдается как есть, без повторной валидации.
+    # Объектами кэшируются только промежуточные данные, например метрики
+    if isinstance(entry.value, bytes):
+        return Response(
+            entry.value,
+            media_type=media_type,
+            headers={"ETag": etag, "Vary": "accept"},
+        )
+
+    response.headers["ETag"] = etag
+
+    return entry.value
+
+
+def section_from_path(request: Request) -> tuple:
+    return section_key(int(request.path_params["section_id"]))
+
+
+def _node_row(
+    id: str,
+    name: str,
+    type: str,
+    type_description: str | None = None,
+    color: str | None = None,
+) -> dict:
+    return dict(
+        id=id, name=name, type=type, type_description=type_description, color=color
+    )
+
+
+def _link_row(id: str, source: str, target: str) -> dict:
+    return dict(id=id, source=source, target=target)
+
+
+def _stream(db: Session, stmt):
+    return db.execute(stmt.execution_options(yield_per=STREAM_CHUNK_SIZE))
+
+
+# Связи графа сотрудников: вид, таблица, столбцы сотрудника и цели, префикс id цели
+_EMPLOYEE_LINKS = (
+    ("ed", employee_department, "employee_uuid", "departments_id", "department-"),
+    ("ep", employee_project, "employee_uuid", "project_id", "project-"),
+    ("epos", employee_position, "employee_uuid", "position_id", "position-"),
+    ("ee", employee_employee, "employee1_uuid", "employee2_uuid", ""),
+)
+_EMPLOYEE_LINK_PREFIX = {kind: prefix for kind, *_, prefix in _EMPLOYEE_LINKS}
+
+
+def _filter(stmt, column, ids):
+    return stmt if ids is None else stmt.where(column.in_(ids))
+
+
+def graph_rows_query(
+    employees: list[str] | None = None,
+    departments: list[int] | None = None,
+    positions: list[int] | None = None,
+    projects: list[int] | None = None,
+):
+    """
+    Все узлы и связи графа сотрудников одним запросом UNION ALL, только
+    нужные столбцы: (вид, id или источник, имя или цель). Переданные списки id
+    ограничивают узлы, а связи остаются только между ними.
+    """
+    targets = {
+        "department-": departments,
+        "project-": projects,
+        "position-": positions,
+        "": employees,
+    }
+    queries = [
+        _filter(
+            select(literal("employee"), Employee.uuid, Employee.fio),
+            Employee.uuid,
+            employees,
+        ),
+        _filter(
+            select(literal("department"), cast(Department.id, String), Department.name),
+            Department.id,
+            departments,
+        ),
+        _filter(
+            select(literal("position"), cast(Position.id, String), Position.value),
+            Position.id,
+            positions,
+        ),
+        _filter(
+            select(literal("project"), cast(Project.id, String), Project.value),
+            Project.id,
+            projects,
+        ),
+    ]
+
+    for kind, table, source, target, prefix in _EMPLOYEE_LINKS:
+        stmt = select(literal(kind), table.c[source], cast(table.c[target], String))
+        stmt = _filter(stmt, table.c[source], employees)
+        queries.append(_filter(stmt, table.c[target], targets[prefix]))
+
+    return union_all(*queries)
+
 
-@app.get("/graph", response_model=GraphDataSchema, tags=["graph"])
-async def get_graph(ctx: RequestContext = Depends(get_context)):
+def iter_graph_rows(db: Session, **filters) -> GraphRows:
+    """Построчно отдает узлы и связи графа сотрудников с серверного курсора"""
+    for kind, a, b in _stream(db, graph_rows_query(**filters)):
+        if kind == "employee":
+            yield "node", _node_row(a, b, kind)
+        elif kind == "department":
+            yield "node", _node_row(f"department-{a}", b or f"Dept {a}", kind)
+        elif kind in ("position", "project"):
+            yield "node", _node_row(f"{kind}-{a}", b, kind)
+        else:
+            yield "link", _link_row(
+                f"{kind}-{a}-{b}", a, f"{_EMPLOYEE_LINK_PREFIX[kind]}{b}"
+            )
+
+
+def _section_nodes_query():
+    return select(
+        Node.id,
+        Node.name,
+        NodeType.name,
+        NodeType.description,
+        NodeType.color,
+    ).join(NodeType, Node.type_id == NodeType.id)
+
+
+def _section_node_row(id, name, type_name, type_description, color) -> dict:
+    return _node_row(f"node-{id}", name, type_name, type_description, color)
+
+
+def iter_section_graph_rows(
+    db: Session, section_id: int, node_ids: list[int] | None = None
+) -> GraphRows:
+    """
+    Построчно отдает узлы и связи графа раздела с серверного курсора.
+    node_ids ограничивает узлы, а связи остаются только между ними.
+    """
+    nodes = _section_nodes_query().where(NodeType.section_id == section_id)
+    nodes = _filter(nodes, Node.id, node_ids)
+
+    for row in _stream(db, nodes):
+        yield "node", _section_node_row(*row)
+
+    links = (
+        select(node_node.c.node1_id, node_node.c.node2_id)
+        .join(Node, node_node.c.node1_id == Node.id)
+        .join(NodeType, Node.type_id == NodeType.id)
+        .where(NodeType.section_id == section_id)
+    )
+    links = _filter(links, node_node.c.node1_id, node_ids)
+    links = _filter(links, node_node.c.node2_id, node_ids)
+
+    for node_1, node_2 in _stream(db, links):
+        yield "link", _link_row(f"nn-{node_1}-{node_2}", f"node-{node_1}", f"node-{node_2}")
+
+
+def ndjson_response(
+    ctx: RequestContext | RequestPubContext, rows: Callable[[Session], GraphRows]
+) -> StreamingResponse:
+    """
+    Потоковый ответ в формате NDJSON: одна строка {"node": {...}} или
+    {"link": {...}} на элемент графа.
+    """
+    # Соединение запроса больше не нужно, поток читает через свою сессию из
+    # отдельного пула: между частями ответа он не занимает поток маршрутов
+    ctx.db.close()
+
+    def generate() -> Iterator[str]:
+        with StreamSessionLocal() as db:
+            chunk = []
+
+            for kind, row in rows(db):
+                chunk.append(json.dumps({kind: row}, ensure_ascii=False))
+
+                if len(chunk) >= STREAM_CHUNK_SIZE:
+                    yield "\n".join(chunk) + "\n"
+                    chunk.clear()
+
+            if chunk:
+                yield "\n".join(chunk) + "\n"
+
+    return StreamingResponse(generate(), media_type=NDJSON_MEDIA_TYPE)
+
+
+def build_compact_graph(rows: GraphRows) -> CompactGraphSchema:
+    """Собирает компактное представление графа из потока строк"""
+    types = []
+    type_index = {}
+    node_ids = []
+    node_names = []
+    node_types = []
+    node_index = {}
+    links = []
+
+    for kind, row in rows:
+        if kind == "node":
+            type_ = (row["type"], row["type_description"], row["color"])
+
+            if type_ not in type_index:
+                type_index[type_] = len(types)
+                types.append(
+                    GraphNodeTypeSchema(
+                        name=row["type"],
+                        description=row["type_description"],
+                        color=row["color"],
+                    )
+                )
+
+            node_index[row["id"]] = len(node_ids)
+            node_ids.append(row["id"])
+            node_names.append(row["name"])
+            node_types.append(type_index[type_])
+        else:
+            links.append((row["source"], row["target"]))
+
+    # Порядок строк UNION ALL не гарантирован, поэтому индексы концов связей
+    # ищутся, когда известны все узлы
+    link_sources = []
+    link_targets = []
+
+    for source, target in links:
+        source = node_index.get(source)
+        target = node_index.get(target)
+
+        # Связь с узлом вне графа нельзя выразить индексом
+        if source is None or target is None:
+            continue
+
+        link_sources.append(source)
+        link_targets.append(target)
+
+    return CompactGraphSchema(
+        types=types,
+        node_ids=node_ids,
+        node_names=node_names,
+        node_types=node_types,
+        link_sources=link_sources,
+        link_targets=link_targets,
+    )
+
+
+def encode_compact_graph(rows: GraphRows) -> bytes:
+    """JSON компактного графа для кэша снапшотов"""
+    return build_compact_graph(rows).model_dump_json().encode()
+
+
+def encode_graph(rows: GraphRows, format: GraphFormat = GraphFormat.json) -> bytes:
+    """JSON или MessagePack в форме GraphDataSchema из потока строк"""
     nodes = []
     links = []
 
-    # Загружаем все данные
-    employees = employee_crud.get_all(db=ctx.db)
-    departments = department_crud.get_all(db=ctx.db)
-    positions = position_crud.get_all(db=ctx.db)
-    projects = project_crud.get_all(db=ctx.db)
-
-    # Добавляем узлы
-    nodes.extend(
-        [NodeSchema(id=e.uuid, name=e.fio, type="employee") for e in employees]
-    )
-    nodes.extend(
-        [
-            NodeSchema(
-                id=f"department-{d.id}",
-                name=d.name or f"Dept {d.id}",
-                type="department",
-            )
-            for d in departments
-        ]
-    )
-    nodes.extend(
-        [
-            NodeSchema(id=f"position-{p.id}", name=p.value, type="position")
-            for p in positions
-        ]
-    )
-    nodes.extend(
-        [
-            NodeSchema(id=f"project-{p.id}", name=p.value, type="project")
-            for p in projects
-        ]
-    )
-
-    # Связи: employee - department
-    for ed in ctx.db.execute(select(employee_department)).fetchall():
-        employee_uuid, dept_id = ed
-        links.append(
-            LinkSchema(
-                id=f"ed-{employee_uuid}-{dept_id}",
-                source=employee_uuid,
-                target=f"department-{dept_id}",
-            )
+    for kind, row in rows:
+        (nodes if kind == "node" else links).append(row)
+
+    if format == GraphFormat.msgpack:
+        return encode_msgpack(dict(nodes=nodes, links=links))
+
+    return json.dumps(dict(nodes=nodes, links=links), ensure_ascii=False).encode()
+
+
+def build_graph(db: Session, format: GraphFormat = GraphFormat.json) -> bytes:
+    """
+    Собирает JSON графа сотрудников, отделов, должностей и проектов из
+    сырых строк, без ORM-объектов и pydantic-моделей.
+    """
+    return encode_graph(iter_graph_rows(db), format)
+
+
+@app.get(
+    "/graph",
+    response_model=GraphDataSchema | CompactGraphSchema,
+    tags=["graph"],
+    dependencies=[conditional(EMPLOYEE_GRAPH, vary=("accept",)), GRAPH_BUDGET],
+)
+def get_graph(
+    request: Request,
+    response: Response,
+    format: GraphFormat | None = None,
+    ctx: RequestContext = Depends(get_context),
+):
+    return employee_graph_response(request, response, format, ctx)
+
+
+@app.get(
+    "/public/graph",
+    response_model=GraphDataSchema | CompactGraphSchema,
+    tags=["graph"],
+    dependencies=[
+        rate_limit(public_rate_limiter),
+        conditional(EMPLOYEE_GRAPH, vary=("accept",), public=True),
+        GRAPH_BUDGET,
+    ],
+)
+def public_get_graph(
+    request: Request,
+    response: Response,
+    format: GraphFormat | None = None,
+    ctx: RequestPubContext = Depends(get_pub_context),
+):
+    """
+    Публичный граф: снапшот живет PUBLIC_GRAPH_TTL секунд даже после изменений,
+    первую сборку одновременные запросы ждут общую, частота ограничена на клиента.
+    """
+    return employee_graph_response(request, response, format, ctx, PUBLIC_GRAPH_TTL)
+
+
+def employee_graph_response(
+    request: Request,
+    response: Response,
+    format: GraphFormat | None,
+    ctx: RequestContext | RequestPubContext,
+    ttl: float | None = None,
+):
+    """
+    Граф сотрудников в запрошенном формате. Маршруты синхронные, чтобы сборка
+    снапшота шла в пуле потоков, а не блокировала цикл событий.
+    """
+    format = resolve_format(request, format)
+
+    if format == GraphFormat.ndjson:
+        return ndjson_response(ctx, iter_graph_rows)
+
+    if format == GraphFormat.compact:
+        return cached_graph(
+            request,
+            response,
+            EMPLOYEE_GRAPH,
+            ctx.db,
+            lambda db: encode_compact_graph(iter_graph_rows(db)),
+            variant=GraphFormat.compact,
+            ttl=ttl,
         )
 
-    # employee - project
-    for ep in ctx.db.execute(select(employee_project)).fetchall():
-        employee_uuid, proj_id = ep
-        links.append(
-            LinkSchema(
-                id=f"ep-{employee_uuid}-{proj_id}",
-                source=employee_uuid,
-                target=f"project-{proj_id}",
-            )
+    if format == GraphFormat.msgpack:
+        return cached_graph(
+            request,
+            response,
+            EMPLOYEE_GRAPH,
+            ctx.db,
+            lambda db: build_graph(db, GraphFormat.msgpack),
+            variant=GraphFormat.msgpack,
+            ttl=ttl,
+            media_type=MSGPACK_MEDIA_TYPE,
         )
 
-    # employee - position
-    for ep in ctx.db.execute(select(employee_position)).fetchall():
-        employee_uuid, pos_id = ep
-        links.append(
-            LinkSchema(
-                id=f"epos-{employee_uuid}-{pos_id}",
-                source=employee_uuid,
-                target=f"position-{pos_id}",
-            )
+    return cached_graph(request, response, EMPLOYEE_GRAPH, ctx.db, build_graph, ttl=ttl)
+
+
+def build_section_graph(
+    db: Session, section_id: int, format: GraphFormat = GraphFormat.json
+) -> bytes:
+    """Собирает JSON графа узлов раздела: два запроса без ORM-объектов"""
+    return encode_graph(iter_section_graph_rows(db, section_id), format)
+
+
+# Публичные разделы отдает nginx из файлов, обновляемых при каждом изменении
+section_publisher = SnapshotPublisher(PUBLIC_GRAPH_DIR, build_section_graph)
+
+
+def _publish_changed_sections(keys: tuple) -> None:
+    for key in keys:
+        if isinstance(key, tuple) and key[:1] == ("section",):
+            section_publisher.schedule(key[1])
+
+
+graph_versions.listen(_publish_changed_sections)
+
+
+app.router.add_event_handler("startup", section_publisher.publish_all)
+
+
+class SectionTopology(NamedTuple):
+    nodes: list[dict]
+    links: list[dict]
+    sources: np.ndarray
+    targets: np.ndarray
+    digest: str
+
+
+def build_section_topology(db: Session, section_id: int) -> SectionTopology:
+    """
+    Граф раздела для раскладки. Узлы и связи упорядочены по id, чтобы
+    координаты из кэша по хэшу совпадали с порядком узлов.
+    """
+    nodes = []
+    links = []
+
+    for kind, row in iter_section_graph_rows(db, section_id):
+        (nodes if kind == "node" else links).append(row)
+
+    nodes.sort(key=lambda row: row["id"])
+    links.sort(key=lambda row: row["id"])
+
+    index = {row["id"]: i for i, row in enumerate(nodes)}
+    # Связи с узлами других разделов на раскладку не влияют
+    pairs = [
+        (index[row["source"]], index[row["target"]])
+        for row in links
+        if row["source"] in index and row["target"] in index
+    ]
+    sources, targets = np.array(pairs, dtype=np.intp).reshape(-1, 2).T
+
+    return SectionTopology(
+        nodes,
+        links,
+        sources,
+        targets,
+        topology_hash(index, ((row["source"], row["target"]) for row in links)),
+    )
+
+
+def _layout_requested(request: Request) -> bool:
+    return request.query_params.get("layout", "").lower() in ("1", "true", "on", "yes")
+
+
+def _layout_config(request: Request):
+    # Раскладка зависит от настроек узлов, обычный граф - нет
+    return table_key("config") if _layout_requested(request) else None
+
+
+def layout_settings(db: Session, user_id: int, section_id: int) -> tuple[float, float]:
+    """distance и node_radius раздела: настройки пользователя поверх общих"""
+    values = {}
+
+    for owner in (-1, user_id):
+        for conf in config_crud.get(
+            db=db, name="nodes", user_id=owner, section_id=section_id
+        ):
+            values[conf.key] = conf.value
+
+    def number(key: str, default: float) -> float:
+        try:
+            value = float(values.get(key))
+        except (TypeError, ValueError):
+            return default
+
+        return value if value > 0 else default
+
+    return (
+        number("distance", DEFAULT_DISTANCE),
+        number("node_radius", DEFAULT_NODE_RADIUS),
+    )
+
+
+async def layout_graph(
+    request: Request, ctx: RequestContext, section_id: int
+) -> Response:
+    """JSON графа раздела с координатами узлов из серверной раскладки"""
+    entry = await run_in_threadpool(
+        graph_cache.get_entry,
+        section_key(section_id),
+        ctx.db,
+        lambda db: build_section_topology(db, section_id),
+        variant="topology",
+    )
+    topology = entry.value
+    distance, node_radius = await run_in_threadpool(
+        layout_settings, ctx.db, ctx.user.id, section_id
+    )
+
+    position = await section_layouts.get(
+        (section_id, topology.digest, distance, node_radius),
+        len(topology.nodes),
+        topology.sources,
+        topology.targets,
+        distance,
+        node_radius,
+    )
+
+    nodes = [
+        dict(row, x=round(x, 1), y=round(y, 1))
+        for row, (x, y) in zip(topology.nodes, position.tolist())
+    ]
+    # Как у conditional(per_user=...): раскладка по настройкам пользователя
+    etag = make_etag(
+        request,
+        entry.version,
+        graph_versions.get(table_key("config")),
+        f"user-{ctx.user.id}",
+        vary=("accept",),
+    )
+
+    return Response(
+        json.dumps(dict(nodes=nodes, links=topology.links), ensure_ascii=False).encode(),
+        media_type="application/json",
+        headers={"ETag": etag, "Vary": "accept, authorization"},
+    )
+
+
+def _section_links(stmt, section_id: int, node_1, node_2):
+    """Выборка по связям, у которых оба узла (node_1, node_2) лежат в разделе"""
+    type_1, type_2 = aliased(NodeType), aliased(NodeType)
+
+    return (
+        stmt.select_from(node_node)
+        .join(node_1, node_node.c.node1_id == node_1.id)
+        .join(node_2, node_node.c.node2_id == node_2.id)
+        .join(type_1, node_1.type_id == type_1.id)
+        .join(type_2, node_2.type_id == type_2.id)
+        .where(type_1.section_id == section_id, type_2.section_id == section_id)
+    )
+
+
+def _type_node_row(id, name, description, color, count) -> dict:
+    return dict(
+        _node_row(f"type-{id}", name, name, description, color), count=count
+    )
+
+
+def _weighted_link_row(source: str, target: str, weight: int) -> dict:
+    return dict(_link_row(f"agg-{source}-{target}", source, target), weight=weight)
+
+
+def build_section_summary(db: Session, section_id: int) -> bytes:
+    """
+    Сводный граф раздела: тип узлов становится узлом с числом участников,
+    связи между типами схлопываются в одну с весом. Считается в SQL через
+    GROUP BY, поэтому размер ответа зависит только от числа типов.
+    """
+    types = (
+        select(
+            NodeType.id,
+            NodeType.name,
+            NodeType.description,
+            NodeType.color,
+            func.count(Node.id),
+        )
+        .join(Node, Node.type_id == NodeType.id)
+        .where(NodeType.section_id == section_id)
+        .group_by(NodeType.id, NodeType.name, NodeType.description, NodeType.color)
+    )
+    node_1, node_2 = aliased(Node), aliased(Node)
+    links = _section_links(
+        select(node_1.type_id, node_2.type_id, func.count()), section_id, node_1, node_2
+    ).group_by(node_1.type_id, node_2.type_id)
+
+    nodes = [_type_node_row(*row) for row in db.execute(types)]
+    links = [
+        _weighted_link_row(f"type-{type_1}", f"type-{type_2}", weight)
+        for type_1, type_2, weight in db.execute(links)
+    ]
+
+    return json.dumps(dict(nodes=nodes, links=links), ensure_ascii=False).encode()
+
+
+def build_section_type(
+    db: Session, section_id: int, type_id: int, expanded: tuple[int, ...] = ()
+) -> bytes:
+    """
+    Раскрытие одного типа сводного графа: его узлы и их связи. Связи с узлами
+    типов из expanded (уже раскрытых клиентом) идут напрямую, с остальными
+    типами - к узлу типа с весом.
+    """
+    opened = {type_id, *expanded}
+    nodes = _section_nodes_query().where(
+        NodeType.section_id == section_id, Node.type_id == type_id
+    )
+
+    node_1, node_2 = aliased(Node), aliased(Node)
+    open_1, open_2 = node_1.type_id.in_(opened), node_2.type_id.in_(opened)
+    end_1 = case((open_1, node_1.id), else_=node_1.type_id)
+    end_2 = case((open_2, node_2.id), else_=node_2.type_id)
+    links = (
+        _section_links(
+            select(open_1, end_1, open_2, end_2, func.count()),
+            section_id,
+            node_1,
+            node_2,
         )
+        .where((node_1.type_id == type_id) | (node_2.type_id == type_id))
+        .group_by(open_1, end_1, open_2, end_2)
+    )
 
-    # employee - employee
-    for ee in ctx.db.execute(select(employee_employee)).fetchall():
-        e1, e2 = ee
-        links.append(LinkSchema(id=f"ee-{e1}-{e2}", source=e1, target=e2))
+    rows = [("node", _section_node_row(*row)) for row in _stream(db, nodes)]
 
-    return GraphDataSchema(nodes=nodes, links=links)
+    for is_node_1, id_1, is_node_2, id_2, weight in _stream(db, links):
+        source = f"node-{id_1}" if is_node_1 else f"type-{id_1}"
+        target = f"node-{id_2}" if is_node_2 else f"type-{id_2}"
 
+        if is_node_1 and is_node_2:
+            rows.append(("link", _link_row(f"nn-{id_1}-{id_2}", source, target)))
+        else:
+            rows.append(("link", _weighted_link_row(source, target, weight)))
 
-@app.get("/public/graph", response_model=GraphDataSchema, tags=["graph"])
-async def public_get_graph(ctx: RequestPubContext = Depends(get_pub_context)):
-    return await get_graph(ctx)
+    return encode_graph(rows)
 
 
-@app.get("/graph/section/{section_id}", response_model=GraphDataSchema, tags=["graph"])
+@app.get(
+    "/graph/section/{section_id}",
+    response_model=(
+        GraphDataSchema | CompactGraphSchema | LayoutGraphSchema | SummaryGraphSchema
+    ),
+    tags=["graph"],
+    dependencies=[
+        # Настройки раскладки у каждого пользователя свои
+        conditional(
+            section_from_path,
+            _layout_config,
+            vary=("accept",),
+            per_user=_layout_requested,
+        ),
+        SECTION_GRAPH_BUDGET,
+    ],
+)
 async def get_graph_section_by_id(
     section_id: int,
+    request: Request,
+    response: Response,
+    format: GraphFormat | None = None,
+    layout: bool = False,
+    detail: GraphDetail = GraphDetail.full,
+    summary_over: int | None = Query(None, ge=1),
     ctx: RequestContext = Depends(get_context),
 ):
-    nodes = []
-    links = []
+    """
+    С layout=true узлы JSON-ответа получают координаты x, y, посчитанные на
+    сервере с distance и node_radius из настроек раздела.
 
-    model_nodes: List[Node] = node_crud.get_by_section_id(
-        db=ctx.db, section_id=section_id
-    )
+    detail=summary отдает сводный граф по типам узлов, раскрыть тип можно через
+    /graph/section/{id}/types/{type_id}. По умолчанию граф отдается целиком;
+    с summary_over=N JSON раздела больше N узлов отдается сводным.
+    """
+    format = resolve_format(request, format)
 
-    # Добавляем узлы
-    nodes.extend(
-        [
-            NodeSchema(
-                id=f"node-{n.id}",
-                name=n.name,
-                type=n.type.name,
-                type_description=n.type.description,
-                color=n.type.color,
+    # Размер раздела из кэша снапшотов, пересборка идет в пуле потоков
+    if summary_over is not None and format == GraphFormat.json:
+        size = await run_in_threadpool(section_size_cached, ctx.db, section_id)
+
+        if size > summary_over:
+            detail = GraphDetail.summary
+
+    if layout and detail != GraphDetail.summary:
+        if format != GraphFormat.json:
+            raise HTTPException(
+                status_code=400, detail="layout is supported only for json format"
             )
-            for n in model_nodes
-        ]
+
+        return await layout_graph(request, ctx, section_id)
+
+    return await run_in_threadpool(
+        section_graph_response, request, response, section_id, format, detail, ctx
     )
 
-    # Связи
-    for nn in ctx.db.execute(
-        select(node_node).where(
-            (node_node.c.node1_id == Node.id)
-            & (Node.type_id == NodeType.id)
-            & (NodeType.section_id == section_id)
+
+def section_size(db: Session, section_id: int) -> int:
+    return db.scalar(
+        select(func.count(Node.id))
+        .join(NodeType, Node.type_id == NodeType.id)
+        .where(NodeType.section_id == section_id)
+    )
+
+
+def section_size_cached(db: Session, section_id: int) -> int:
+    return graph_cache.get(
+        section_key(section_id),
+        db,
+        lambda db: section_size(db, section_id),
+        variant="size",
+    )
+
+
+def section_graph_response(
+    request: Request,
+    response: Response,
+    section_id: int,
+    format: GraphFormat,
+    detail: GraphDetail,
+    ctx: RequestContext,
+):
+    if detail == GraphDetail.summary:
+        if format != GraphFormat.json:
+            raise HTTPException(
+                status_code=400, detail="summary is supported only for json format"
+            )
+
+        return cached_graph(
+            request,
+            response,
+            section_key(section_id),
+            ctx.db,
+            lambda db: build_section_summary(db, section_id),
+            variant=GraphDetail.summary,
         )
-    ).fetchall():
-        node_1, node_2, *_ = nn
-        links.append(
-            LinkSchema(
-                id=f"nn-{node_1}-{node_2}",
-                source=f"node-{node_1}",
-                target=f"node-{node_2}",
+
+    if format == GraphFormat.ndjson:
+        return ndjson_response(
+            ctx, lambda db: iter_section_graph_rows(db, section_id)
+        )
+
+    if format == GraphFormat.compact:
+        return cached_graph(
+            request,
+            response,
+            section_key(section_id),
+            ctx.db,
+            lambda db: encode_compact_graph(
+                iter_section_graph_rows(db, section_id)
+            ),
+            variant=GraphFormat.compact,
+        )
+
+    if format == GraphFormat.msgpack:
+        return cached_graph(
+            request,
+            response,
+            section_key(section_id),
+            ctx.db,
+            lambda db: build_section_graph(db, section_id, GraphFormat.msgpack),
+            variant=GraphFormat.msgpack,
+            media_type=MSGPACK_MEDIA_TYPE,
+        )
+
+    return cached_graph(
+        request,
+        response,
+        section_key(section_id),
+        ctx.db,
+        lambda db: build_section_graph(db, section_id),
+    )
+
+
+@app.get(
+    "/graph/section/{section_id}/types/{type_id}",
+    response_model=SummaryGraphSchema,
+    tags=["graph"],
+    dependencies=[
+        conditional(section_from_path, vary=("accept",)),
+        SECTION_GRAPH_BUDGET,
+    ],
+)
+def get_graph_section_type(
+    section_id: int,
+    type_id: int,
+    request: Request,
+    response: Response,
+    expanded: list[int] = Query([]),
+    ctx: RequestContext = Depends(get_context),
+):
+    """Узлы одного типа сводного графа раздела со связями"""
+    expanded = tuple(sorted(set(expanded) - {type_id}))
+
+    return cached_graph(
+        request,
+        response,
+        section_key(section_id),
+        ctx.db,
+        lambda db: build_section_type(db, section_id, type_id, expanded),
+        variant=("type", type_id, expanded),
+    )
+
+
+@app.get(
+    "/graph/section/{section_id}/changes",
+    response_model=GraphChangesSchema,
+    tags=["graph"],
+    dependencies=[query_budget(8)],
+)
+def get_graph_section_changes(
+    section_id: int,
+    since: int | None = None,
+    ctx: RequestContext = Depends(get_context),
+):
+    """
+    Изменения графа раздела после версии since. Без since или если журнал
+    за этот период уже удален, возвращается reset: граф нужно загрузить целиком.
+    """
+    version = node_change_crud.get_version(ctx.db, section_id)
+
+    if since is None or since < node_change_crud.get_watermark(ctx.db, section_id):
+        return GraphChangesSchema(version=version, reset=True)
+
+    nodes = {}
+    links = {}
+
+    # Схлопываем журнал до итогового действия по каждому узлу и связи
+    for change in node_change_crud.get_since(ctx.db, section_id, since):
+        version = max(version, change.version)
+
+        if change.entity == node_change_crud.ENTITY_LINK:
+            links[(change.node_id, change.node2_id)] = change.action
+        elif not (
+            change.action == node_change_crud.ACTION_RENAME
+            and nodes.get(change.node_id) == node_change_crud.ACTION_ADD
+        ):
+            nodes[change.node_id] = change.action
+
+    alive = [
+        node_id
+        for node_id, action in nodes.items()
+        if action != node_change_crud.ACTION_REMOVE
+    ]
+    rows = {
+        row[0]: _section_node_row(*row)
+        for row in ctx.db.execute(_section_nodes_query().where(Node.id.in_(alive)))
+    }
+
+    result = GraphChangesSchema(version=version)
+
+    for node_id, action in nodes.items():
+        if action == node_change_crud.ACTION_REMOVE or node_id not in rows:
+            result.nodes_removed.append(f"node-{node_id}")
+        elif action == node_change_crud.ACTION_ADD:
+            result.nodes_added.append(NodeSchema(**rows[node_id]))
+        else:
+            result.nodes_updated.append(NodeSchema(**rows[node_id]))
+
+    for (node_1, node_2), action in links.items():
+        if action == node_change_crud.ACTION_REMOVE:
+            result.links_removed.append(f"nn-{node_1}-{node_2}")
+        else:
+            result.links_added.append(
+                LinkSchema(
+                    id=f"nn-{node_1}-{node_2}",
+                    source=f"node-{node_1}",
+                    target=f"node-{node_2}",
+                )
             )
+
+    return result
+
+
+def _section_event(event: dict) -> tuple[str, dict]:
+    """Переводит событие журнала в идентификаторы графа раздела"""
+    if event["action"] == "reset":
+        return "reset", {}
+
+    data = dict(version=event["version"], action=event["action"])
+
+    if event["entity"] == node_change_crud.ENTITY_LINK:
+        node_1, node_2 = event["node_id"], event["node2_id"]
+        data["link"] = _link_row(f"nn-{node_1}-{node_2}", f"node-{node_1}", f"node-{node_2}")
+    elif event["action"] == node_change_crud.ACTION_REMOVE:
+        data["node"] = dict(id=f"node-{event['node_id']}")
+    else:
+        data["node"] = _section_node_row(
+            event["node_id"],
+            event["name"],
+            event["type"],
+            event["type_description"],
+            event["color"],
+        )
+
+    return event["entity"], data
+
+
+@app.get("/graph/section/{section_id}/events", tags=["graph"])
+async def stream_graph_section_events(
+    section_id: int, ctx: RequestContext = Depends(get_stream_context)
+):
+    """
+    Server-Sent Events с изменениями узлов и связей раздела. id события равен
+    версии журнала: после переподключения недостающее можно забрать через
+    /graph/section/{section_id}/changes?since=<id>.
+    """
+
+    async def generate():
+        with section_events.subscribe(section_id) as queue:
+            yield "retry: 3000\n\n"
+
+            while True:
+                try:
+                    event = await asyncio.wait_for(
+                        queue.get(), timeout=SSE_HEARTBEAT_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+
+                name, data = _section_event(event)
+                id_ = f"id: {data['version']}\n" if "version" in data else ""
+
+                yield f"{id_}event: {name}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def employee_edges():
+    """Ребра графа сотрудников в обе стороны, концы в виде id узлов графа"""
+    parts = []
+
+    for _, table, source, target, prefix in _EMPLOYEE_LINKS:
+        a = cast(table.c[source], String)
+        b = cast(literal(prefix) + cast(table.c[target], String), String)
+        parts += [select(a.label("a"), b.label("b")), select(b.label("a"), a.label("b"))]
+
+    return union_all(*parts).cte("edges")
+
+
+def section_edges(section_id: int):
+    """Ребра графа раздела в обе стороны"""
+    in_section = (
+        select(Node.id)
+        .join(NodeType, Node.type_id == NodeType.id)
+        .where(NodeType.section_id == section_id)
+    )
+    a, b = node_node.c.node1_id, node_node.c.node2_id
+
+    return union_all(
+        select(a.label("a"), b.label("b")).where(a.in_(in_section)),
+        select(b.label("a"), a.label("b")).where(a.in_(in_section)),
+    ).cte("edges")
+
+
+def neighborhood(db: Session, edges, start, depth: int, limit: int) -> list:
+    """
+    id узлов в пределах depth переходов от start, ближние первыми. Обход в
+    ширину по уровням, один запрос соседей на уровень: найденные узлы не
+    раскрываются повторно, и обход останавливается, как только набрано
+    limit узлов, поэтому работа ограничена limit, а не размером окрестности.
+    """
+    found = [start]
+    seen = {start}
+    frontier = [start]
+
+    for _ in range(depth):
+        if not frontier or len(found) >= limit:
+            break
+
+        neighbors = db.scalars(
+            select(edges.c.b).where(edges.c.a.in_(frontier)).distinct()
         )
+        frontier = sorted(set(neighbors) - seen)[: limit - len(found)]
+        seen.update(frontier)
+        found += frontier
+
+    return found
+
+
+def _neighborhood_response(rows: GraphRows, truncated: bool) -> Response:
+    headers = {"X-Graph-Truncated": "1"} if truncated else None
+
+    return Response(encode_graph(rows), media_type="application/json", headers=headers)
+
+
+@app.get(
+    "/graph/section/{section_id}/neighborhood/{node_id}",
+    response_model=GraphDataSchema,
+    tags=["graph"],
+    dependencies=[query_budget(4 + NEIGHBORHOOD_MAX_DEPTH)],
+)
+def get_graph_section_neighborhood(
+    section_id: int,
+    node_id: int,
+    depth: int = Query(1, ge=1, le=NEIGHBORHOOD_MAX_DEPTH),
+    limit: int = Query(500, ge=1, le=NEIGHBORHOOD_MAX_NODES),
+    ctx: RequestContext = Depends(get_context),
+):
+    """
+    Узлы раздела в пределах depth переходов от node_id и связи между ними.
+    Если узлов больше limit, остаются ближайшие и ставится X-Graph-Truncated.
+    """
+    if section_id not in node_crud.section_ids(ctx.db, node_id):
+        raise HTTPException(status_code=404, detail="Node not found")
+
+    ids = neighborhood(ctx.db, section_edges(section_id), node_id, depth, limit + 1)
+
+    return _neighborhood_response(
+        iter_section_graph_rows(ctx.db, section_id, node_ids=ids[:limit]),
+        truncated=len(ids) > limit,
+    )
+
+
+@app.get(
+    "/graph/employee/{uuid}/neighborhood",
+    response_model=GraphDataSchema,
+    tags=["graph"],
+    dependencies=[query_budget(3 + NEIGHBORHOOD_MAX_DEPTH)],
+)
+def get_graph_employee_neighborhood(
+    uuid: str,
+    depth: int = Query(1, ge=1, le=NEIGHBORHOOD_MAX_DEPTH),
+    limit: int = Query(500, ge=1, le=NEIGHBORHOOD_MAX_NODES),
+    ctx: RequestContext = Depends(get_context),
+):
+    """То же для графа сотрудников: окрестность сотрудника uuid"""
+    employee_crud.get(ctx.db, uuid)
+
+    ids = neighborhood(ctx.db, employee_edges(), uuid, depth, limit + 1)
+    filters = dict(employees=[], departments=[], positions=[], projects=[])
+
+    for id_ in ids[:limit]:
+        kind, _, number = id_.partition("-")
+
+        if kind in ("department", "position", "project") and number.isdigit():
+            filters[f"{kind}s"].append(int(number))
+        else:
+            filters["employees"].append(id_)
 
-    return GraphDataSchema(nodes=nodes, links=links)
+    return _neighborhood_response(
+        iter_graph_rows(ctx.db, **filters), truncated=len(ids) > limit
+    )
+
+
+def encode_cursor(position: list) -> str:
+    """Непрозрачный курсор из позиции ключа, на которой закончилась часть"""
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+
+def decode_cursor(cursor: str | None, size: int) -> list | None:
+    if cursor is None:
+        return None
+
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (binascii.Error, ValueError):
+        position = None
+
+    if not (
+        isinstance(position, list)
+        and len(position) == size
+        and all(isinstance(value, int) for value in position)
+    ):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    return position
+
+
+def _page(version: int, rows: list, limit: int, to_item, key) -> Response:
+    next_cursor = encode_cursor(key(rows[limit - 1])) if len(rows) > limit else None
+    page = dict(
+        version=version,
+        items=[to_item(row) for row in rows[:limit]],
+        next_cursor=next_cursor,
+    )
+
+    return Response(
+        json.dumps(page, ensure_ascii=False).encode(), media_type="application/json"
+    )
+
+
+@app.get(
+    "/graph/section/{section_id}/nodes",
+    response_model=GraphNodesPageSchema,
+    tags=["graph"],
+    dependencies=[query_budget(5)],
+)
+def get_graph_section_nodes(
+    section_id: int,
+    cursor: str | None = None,
+    limit: int = Query(CHUNK_DEFAULT_SIZE, ge=1, le=CHUNK_MAX_SIZE),
+    ctx: RequestContext = Depends(get_context),
+):
+    """
+    Узлы раздела частями по возрастанию id (keyset, без OFFSET). После загрузки
+    всех частей узлов и связей догнать изменения можно через /changes?since=
+    с version первой части.
+    """
+    position = decode_cursor(cursor, 1)
+    version = node_change_crud.get_version(ctx.db, section_id)
+
+    query = _section_nodes_query().where(NodeType.section_id == section_id)
+
+    if position is not None:
+        query = query.where(Node.id > position[0])
+
+    rows = ctx.db.execute(query.order_by(Node.id).limit(limit + 1)).all()
+
+    return _page(
+        version, rows, limit, lambda row: _section_node_row(*row), lambda row: [row[0]]
+    )
+
+
+@app.get(
+    "/graph/section/{section_id}/links",
+    response_model=GraphLinksPageSchema,
+    tags=["graph"],
+    dependencies=[query_budget(5)],
+)
+def get_graph_section_links(
+    section_id: int,
+    cursor: str | None = None,
+    limit: int = Query(CHUNK_DEFAULT_SIZE, ge=1, le=CHUNK_MAX_SIZE),
+    ctx: RequestContext = Depends(get_context),
+):
+    """Связи раздела частями по возрастанию пары (node1_id, node2_id)"""
+    position = decode_cursor(cursor, 2)
+    version = node_change_crud.get_version(ctx.db, section_id)
+
+    node_1, node_2 = node_node.c.node1_id, node_node.c.node2_id
+    query = (
+        select(node_1, node_2)
+        .join(Node, node_1 == Node.id)
+        .join(NodeType, Node.type_id == NodeType.id)
+        .where(NodeType.section_id == section_id)
+    )
+
+    if position is not None:
+        query = query.where(tuple_(node_1, node_2) > tuple_(*position))
+
+    rows = ctx.db.execute(query.order_by(node_1, node_2).limit(limit + 1)).all()
+
+    return _page(
+        version,
+        rows,
+        limit,
+        lambda row: _link_row(f"nn-{row[0]}-{row[1]}", f"node-{row[0]}", f"node-{row[1]}"),
+        lambda row: [row[0], row[1]],
+    )
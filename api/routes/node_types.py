@@ -1,10 +1,14 @@
 from typing import List
-from fastapi import Depends, HTTPException
+from fastapi import Depends, HTTPException, Request, Response
 from api.auth import app
+from api.cache import table_key
+from api.query_budget import query_budget
 from api.routes_helpers import (
     RequestContext,
+    conditional,
     get_context,
 )
+from api.serializers import rows_response
 from api.schemas import (
     NodeTypeCreate,
     NodeTypeRead,
@@ -13,6 +17,12 @@ from api.crud import (
     node_type_crud,
 )
 
+# Список типов вкладывает узлы и их связи
+NODE_TYPES_KEYS = (table_key("node_types"), table_key("nodes"))
+
+# Проверка токена, типы, пользователи и узлы со своими связями
+NODE_TYPE_READ_BUDGET = query_budget(8)
+
 
 @app.post("/node-types/", response_model=NodeTypeRead, tags=["node-types"])
 def create_node_type(data: NodeTypeCreate, ctx: RequestContext = Depends(get_context)):
@@ -22,28 +32,63 @@ def create_node_type(data: NodeTypeCreate, ctx: RequestContext = Depends(get_con
     return node_type_crud.create(ctx.db, data)
 
 
-@app.get("/node-types/", response_model=List[NodeTypeRead], tags=["node-types"])
+@app.get(
+    "/node-types/",
+    response_model=List[NodeTypeRead],
+    tags=["node-types"],
+    dependencies=[
+        conditional(*NODE_TYPES_KEYS, vary=("accept",)),
+        NODE_TYPE_READ_BUDGET,
+    ],
+)
 def get_node_types(
-    skip: int = 0, limit: int = 250, ctx: RequestContext = Depends(get_context)
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 250,
+    ctx: RequestContext = Depends(get_context),
 ):
-    return node_type_crud.get_all(ctx.db, skip, limit)
+    rows = node_type_crud.read_rows(ctx.db, skip=skip, limit=limit)
+
+    return rows_response(request, rows, response.headers)
 
 
 @app.get(
     "/node-types/by-section/{section_id}",
     response_model=List[NodeTypeRead],
     tags=["node-types"],
+    dependencies=[
+        conditional(*NODE_TYPES_KEYS, vary=("accept",)),
+        NODE_TYPE_READ_BUDGET,
+    ],
 )
-def get_node_types(section_id: int, ctx: RequestContext = Depends(get_context)):
-    return node_type_crud.get_by_section_id(ctx.db, section_id=section_id)
+def get_node_types(
+    section_id: int,
+    request: Request,
+    response: Response,
+    ctx: RequestContext = Depends(get_context),
+):
+    rows = node_type_crud.get_rows_by_section_id(ctx.db, section_id)
 
+    return rows_response(request, rows, response.headers)
 
-@app.get("/node-types/{id}", response_model=NodeTypeRead, tags=["node-types"])
+
+@app.get(
+    "/node-types/{id}",
+    response_model=NodeTypeRead,
+    tags=["node-types"],
+    dependencies=[NODE_TYPE_READ_BUDGET],
+)
 def get_node_type(id: int, ctx: RequestContext = Depends(get_context)):
     return node_type_crud.get(ctx.db, id)
 
 
-@app.get("/node-types/by-name/{name}", response_model=NodeTypeRead, tags=["node-types"])
+@app.get(
+    "/node-types/by-name/{name}",
+    response_model=NodeTypeRead,
+    tags=["node-types"],
+    dependencies=[NODE_TYPE_READ_BUDGET],
+)
 def get_node_type_by_name(name: str, ctx: RequestContext = Depends(get_context)):
     node_type = node_type_crud.get_by_name(ctx.db, name)
     if not node_type:
@@ -55,9 +100,12 @@ def get_node_type_by_name(name: str, ctx: RequestContext = Depends(get_context))
     "/node-types/by-user/{user_id}",
     response_model=List[NodeTypeRead],
     tags=["node-types"],
+    dependencies=[NODE_TYPE_READ_BUDGET],
 )
-def get_node_types_by_user(user_id: int, ctx: RequestContext = Depends(get_context)):
-    return node_type_crud.get_by_user_id(ctx.db, user_id)
+def get_node_types_by_user(
+    user_id: int, request: Request, ctx: RequestContext = Depends(get_context)
+):
+    return rows_response(request, node_type_crud.get_rows_by_user_id(ctx.db, user_id))
 
 
 @app.put("/node-types/{id}", response_model=NodeTypeRead, tags=["node-types"])
@@ -1,10 +1,12 @@
 from typing import List
-from fastapi import Depends, HTTPException
+from fastapi import Depends, HTTPException, Request
 from api.auth import app
+from api.query_budget import query_budget
 from api.routes_helpers import (
     RequestContext,
     get_context,
 )
+from api.serializers import rows_response
 from api.schemas import (
     NodeCreate,
     NodeLink,
@@ -15,6 +17,9 @@ from api.crud import (
     node_crud,
 )
 
+# Проверка токена, узлы, пользователи и связи в обе стороны
+NODE_READ_BUDGET = query_budget(6)
+
 
 @app.post("/nodes/", response_model=NodeRead, tags=["nodes"])
 def create_node(data: NodeCreate, ctx: RequestContext = Depends(get_context)):
@@ -24,19 +29,37 @@ def create_node(data: NodeCreate, ctx: RequestContext = Depends(get_context)):
     return node_crud.create(ctx.db, data)
 
 
-@app.get("/nodes/", response_model=List[NodeRead], tags=["nodes"])
+@app.get(
+    "/nodes/",
+    response_model=List[NodeRead],
+    tags=["nodes"],
+    dependencies=[NODE_READ_BUDGET],
+)
 def get_nodes(
-    skip: int = 0, limit: int = 250, ctx: RequestContext = Depends(get_context)
+    request: Request,
+    skip: int = 0,
+    limit: int = 250,
+    ctx: RequestContext = Depends(get_context),
 ):
-    return node_crud.get_all(ctx.db, skip, limit)
+    return rows_response(request, node_crud.read_rows(ctx.db, skip=skip, limit=limit))
 
 
-@app.get("/nodes/{id}", response_model=NodeRead, tags=["nodes"])
+@app.get(
+    "/nodes/{id}",
+    response_model=NodeRead,
+    tags=["nodes"],
+    dependencies=[NODE_READ_BUDGET],
+)
 def get_node(id: int, ctx: RequestContext = Depends(get_context)):
     return node_crud.get(ctx.db, id)
 
 
-@app.get("/nodes/by-id/{node_id}", response_model=NodeRead, tags=["nodes"])
+@app.get(
+    "/nodes/by-id/{node_id}",
+    response_model=NodeRead,
+    tags=["nodes"],
+    dependencies=[NODE_READ_BUDGET],
+)
 def get_node_by_id(node_id: int, ctx: RequestContext = Depends(get_context)):
     node = node_crud.get_by_id(ctx.db, node_id)
     if not node:
@@ -44,7 +67,12 @@ def get_node_by_id(node_id: int, ctx: RequestContext = Depends(get_context)):
     return node
 
 
-@app.get("/nodes/by-name/{name}", response_model=NodeRead, tags=["nodes"])
+@app.get(
+    "/nodes/by-name/{name}",
+    response_model=NodeRead,
+    tags=["nodes"],
+    dependencies=[NODE_READ_BUDGET],
+)
 def get_node_by_name(name: str, ctx: RequestContext = Depends(get_context)):
     node = node_crud.get_by_name(ctx.db, name)
     if not node:
@@ -52,16 +80,28 @@ def get_node_by_name(name: str, ctx: RequestContext = Depends(get_context)):
     return node
 
 
-@app.get("/nodes/by-user/{user_id}", response_model=List[NodeRead], tags=["nodes"])
-def get_nodes_by_user(user_id: int, ctx: RequestContext = Depends(get_context)):
-    return node_crud.get_by_user_id(ctx.db, user_id)
+@app.get(
+    "/nodes/by-user/{user_id}",
+    response_model=List[NodeRead],
+    tags=["nodes"],
+    dependencies=[NODE_READ_BUDGET],
+)
+def get_nodes_by_user(
+    user_id: int, request: Request, ctx: RequestContext = Depends(get_context)
+):
+    return rows_response(request, node_crud.get_rows_by_user_id(ctx.db, user_id))
 
 
 @app.get(
-    "/nodes/by-section/{section_id}", response_model=List[NodeRead], tags=["nodes"]
+    "/nodes/by-section/{section_id}",
+    response_model=List[NodeRead],
+    tags=["nodes"],
+    dependencies=[NODE_READ_BUDGET],
 )
-def get_nodes_by_user(section_id: int, ctx: RequestContext = Depends(get_context)):
-    return node_crud.get_by_section_id(ctx.db, section_id)
+def get_nodes_by_user(
+    section_id: int, request: Request, ctx: RequestContext = Depends(get_context)
+):
+    return rows_response(request, node_crud.get_rows_by_section_id(ctx.db, section_id))
 
 
 @app.put("/nodes/{id}", response_model=NodeRead, tags=["nodes"])
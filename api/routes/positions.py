@@ -1,10 +1,13 @@
 from typing import List
-from fastapi import Depends, HTTPException
+from fastapi import Depends, HTTPException, Request, Response
 from api.auth import app
+from api.cache import table_key
 from api.routes_helpers import (
     RequestContext,
+    conditional,
     get_context,
 )
+from api.serializers import rows_response
 from api.schemas import (
     PositionCreate,
     PositionRead,
@@ -30,11 +33,22 @@ def create_position(data: PositionCreate, ctx: RequestContext = Depends(get_cont
     return position_crud.create(ctx.db, data)
 
 
-@app.get("/positions/", response_model=List[PositionRead], tags=["positions"])
+@app.get(
+    "/positions/",
+    response_model=List[PositionRead],
+    tags=["positions"],
+    dependencies=[conditional(table_key("positions"), vary=("accept",))],
+)
 def get_positions(
-    skip: int = 0, limit: int = 250, ctx: RequestContext = Depends(get_context)
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 250,
+    ctx: RequestContext = Depends(get_context),
 ):
-    return position_crud.get_all(ctx.db, skip, limit)
+    rows = position_crud.read_rows(ctx.db, skip=skip, limit=limit)
+
+    return rows_response(request, rows, response.headers)
 
 
 @app.get("/positions/{id}", response_model=PositionRead, tags=["positions"])
@@ -1,10 +1,13 @@
 from typing import List
-from fastapi import Depends, HTTPException
+from fastapi import Depends, HTTPException, Request, Response
 from api.auth import app
+from api.cache import table_key
 from api.routes_helpers import (
     RequestContext,
+    conditional,
     get_context,
 )
+from api.serializers import rows_response
 from api.schemas import (
     ProjectCreate,
     ProjectRead,
@@ -27,11 +30,22 @@ def create_project(data: ProjectCreate, ctx: RequestContext = Depends(get_contex
     return project_crud.create(ctx.db, data)
 
 
-@app.get("/projects/", response_model=List[ProjectRead], tags=["projects"])
+@app.get(
+    "/projects/",
+    response_model=List[ProjectRead],
+    tags=["projects"],
+    dependencies=[conditional(table_key("projects"), vary=("accept",))],
+)
 def get_projects(
-    skip: int = 0, limit: int = 250, ctx: RequestContext = Depends(get_context)
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 250,
+    ctx: RequestContext = Depends(get_context),
 ):
-    return project_crud.get_all(ctx.db, skip, limit)
+    rows = project_crud.read_rows(ctx.db, skip=skip, limit=limit)
+
+    return rows_response(request, rows, response.headers)
 
 
 @app.get("/projects/{id}", response_model=ProjectRead, tags=["projects"])
@@ -1,10 +1,11 @@
 from typing import List
-from fastapi import Depends
+from fastapi import Depends, Request
 from api.auth import app
 from api.routes_helpers import (
     RequestContext,
     get_context,
 )
+from api.serializers import rows_response
 from api.schemas import (
     DepartmentRead,
     EmployeeDepartmentCreate,
@@ -47,15 +48,21 @@ def create_employee_department(
     response_model=List[DepartmentRead],
     tags=["employee"],
 )
-def get_employee_department_uuid(uuid: str, ctx: RequestContext = Depends(get_context)):
-    return employee_crud.get_bind_department(ctx.db, uuid)
+def get_employee_department_uuid(
+    uuid: str, request: Request, ctx: RequestContext = Depends(get_context)
+):
+    rows = employee_crud.get_bind_rows(ctx.db, "departments", uuid)
+
+    return rows_response(request, rows)
 
 
 @app.get(
     "/employee_department/", response_model=List[DepartmentRead], tags=["employee"]
 )
-def get_employee_department(ctx: RequestContext = Depends(get_context)):
-    return employee_crud.get_bind_department(ctx.db)
+def get_employee_department(
+    request: Request, ctx: RequestContext = Depends(get_context)
+):
+    return rows_response(request, employee_crud.get_bind_rows(ctx.db, "departments"))
 
 
 @app.delete("/employee_department/", tags=["employee"])
@@ -84,13 +91,17 @@ def create_employee_employee(
 @app.get(
     "/employee_employee/{uuid}", response_model=List[EmployeeRead], tags=["employee"]
 )
-def get_employee_employee_uuid(uuid: str, ctx: RequestContext = Depends(get_context)):
-    return employee_crud.get_bind_employee(ctx.db, uuid)
+def get_employee_employee_uuid(
+    uuid: str, request: Request, ctx: RequestContext = Depends(get_context)
+):
+    rows = employee_crud.get_bind_rows(ctx.db, "employees", uuid)
+
+    return rows_response(request, rows)
 
 
 @app.get("/employee_employee/", response_model=List[EmployeeRead], tags=["employee"])
-def get_employee_employee(ctx: RequestContext = Depends(get_context)):
-    return employee_crud.get_bind_employee(ctx.db)
+def get_employee_employee(request: Request, ctx: RequestContext = Depends(get_context)):
+    return rows_response(request, employee_crud.get_bind_rows(ctx.db, "employees"))
 
 
 @app.delete("/employee_employee/", tags=["employee"])
@@ -120,13 +131,17 @@ def create_employee_position(
 @app.get(
     "/employee_position/{uuid}", response_model=List[PositionRead], tags=["employee"]
 )
-def get_employee_position_uuid(uuid: str, ctx: RequestContext = Depends(get_context)):
-    return employee_crud.get_bind_position(ctx.db, uuid)
+def get_employee_position_uuid(
+    uuid: str, request: Request, ctx: RequestContext = Depends(get_context)
+):
+    rows = employee_crud.get_bind_rows(ctx.db, "positions", uuid)
+
+    return rows_response(request, rows)
 
 
 @app.get("/employee_position/", response_model=List[PositionRead], tags=["employee"])
-def get_employee_position(ctx: RequestContext = Depends(get_context)):
-    return employee_crud.get_bind_position(ctx.db)
+def get_employee_position(request: Request, ctx: RequestContext = Depends(get_context)):
+    return rows_response(request, employee_crud.get_bind_rows(ctx.db, "positions"))
 
 
 @app.delete("/employee_position/", tags=["employee"])
@@ -156,13 +171,15 @@ def create_employee_project(
 @app.get(
     "/employee_project/{uuid}", response_model=List[ProjectRead], tags=["employee"]
 )
-def get_employee_project_uuid(uuid: str, ctx: RequestContext = Depends(get_context)):
-    return employee_crud.get_bind_project(ctx.db, uuid)
+def get_employee_project_uuid(
+    uuid: str, request: Request, ctx: RequestContext = Depends(get_context)
+):
+    return rows_response(request, employee_crud.get_bind_rows(ctx.db, "projects", uuid))
 
 
 @app.get("/employee_project/", response_model=List[ProjectRead], tags=["employee"])
-def get_employee_project(ctx: RequestContext = Depends(get_context)):
-    return employee_crud.get_bind_project(ctx.db)
+def get_employee_project(request: Request, ctx: RequestContext = Depends(get_context)):
+    return rows_response(request, employee_crud.get_bind_rows(ctx.db, "projects"))
 
 
 @app.delete("/employee_project/", tags=["employee"])
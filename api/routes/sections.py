@@ -1,10 +1,14 @@
 from typing import List
-from fastapi import Depends, HTTPException
+from fastapi import Depends, HTTPException, Request, Response
 from api.auth import app
+from api.cache import table_key
+from api.query_budget import query_budget
 from api.routes_helpers import (
     RequestContext,
+    conditional,
     get_context,
 )
+from api.serializers import rows_response
 from api.schemas import (
     SectionCreate,
     SectionRead,
@@ -13,6 +17,9 @@ from api.crud import (
     section_crud,
 )
 
+# Проверка токена, разделы и их пользователи
+SECTION_READ_BUDGET = query_budget(3)
+
 
 @app.post("/sections/", tags=["sections"])
 def create_section(data: SectionCreate, ctx: RequestContext = Depends(get_context)):
@@ -21,19 +28,43 @@ def create_section(data: SectionCreate, ctx: RequestContext = Depends(get_contex
     section_crud.create(ctx.db, data)
 
 
-@app.get("/sections/", response_model=List[SectionRead], tags=["sections"])
+@app.get(
+    "/sections/",
+    response_model=List[SectionRead],
+    tags=["sections"],
+    dependencies=[
+        conditional(table_key("sections"), vary=("accept",)),
+        SECTION_READ_BUDGET,
+    ],
+)
 def get_sections(
-    skip: int = 0, limit: int = 250, ctx: RequestContext = Depends(get_context)
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 250,
+    ctx: RequestContext = Depends(get_context),
 ):
-    return section_crud.get_all(ctx.db, skip, limit)
+    rows = section_crud.read_rows(ctx.db, skip=skip, limit=limit)
 
+    return rows_response(request, rows, response.headers)
 
-@app.get("/sections/{id}", response_model=SectionRead, tags=["sections"])
+
+@app.get(
+    "/sections/{id}",
+    response_model=SectionRead,
+    tags=["sections"],
+    dependencies=[SECTION_READ_BUDGET],
+)
 def get_section(id: int, ctx: RequestContext = Depends(get_context)):
     return section_crud.get(ctx.db, id)
 
 
-@app.get("/sections/by-name/{name}", response_model=SectionRead, tags=["sections"])
+@app.get(
+    "/sections/by-name/{name}",
+    response_model=SectionRead,
+    tags=["sections"],
+    dependencies=[SECTION_READ_BUDGET],
+)
 def get_section_by_name(name: str, ctx: RequestContext = Depends(get_context)):
     section = section_crud.get_by_name(ctx.db, name)
     if not section:
@@ -42,10 +73,15 @@ def get_section_by_name(name: str, ctx: RequestContext = Depends(get_context)):
 
 
 @app.get(
-    "/sections/by-user/{user_id}", response_model=List[SectionRead], tags=["sections"]
+    "/sections/by-user/{user_id}",
+    response_model=List[SectionRead],
+    tags=["sections"],
+    dependencies=[SECTION_READ_BUDGET],
 )
-def get_sections_by_user(user_id: int, ctx: RequestContext = Depends(get_context)):
-    return section_crud.get_by_user_id(ctx.db, user_id)
+def get_sections_by_user(
+    user_id: int, request: Request, ctx: RequestContext = Depends(get_context)
+):
+    return rows_response(request, section_crud.get_rows_by_user_id(ctx.db, user_id))
 
 
 @app.put("/sections/{id}", response_model=SectionRead, tags=["sections"])
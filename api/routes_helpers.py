@@ -1,16 +1,15 @@
-from fastapi import Depends
+import hashlib
+from fastapi import Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
+from api.cache import BOOT_ID, graph_versions
 from api.db import get_db
-from api.auth import check_token
-from api.models import (
-    User,
-)
-from typing import NamedTuple
+from api.auth import CachedUser, check_token
+from typing import Callable, Hashable, NamedTuple
 
 
 class RequestContext(NamedTuple):
     db: Session
-    user: User
+    user: CachedUser
 
 
 class RequestPubContext(NamedTuple):
@@ -18,12 +17,103 @@ class RequestPubContext(NamedTuple):
 
 
 def get_context(
-    db: Session = Depends(get_db), user: User = Depends(check_token)
+    db: Session = Depends(get_db), user: CachedUser = Depends(check_token)
 ) -> RequestContext:
     return RequestContext(db=db, user=user)
 
 
+def get_stream_context(
+    request: Request, token: str | None = None, db: Session = Depends(get_db)
+) -> RequestContext:
+    """
+    Контекст для долгих потоков. EventSource не умеет передавать заголовки,
+    поэтому токен можно передать параметром token. Сессия закрывается сразу
+    после проверки токена, чтобы поток не держал соединение с БД.
+    """
+    scheme, _, header_token = request.headers.get("authorization", "").partition(" ")
+
+    if scheme.lower() == "bearer" and header_token:
+        token = header_token
+
+    if not token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+
+    user = check_token(token, db)
+    db.close()
+
+    return RequestContext(db=db, user=user)
+
+
 def get_pub_context(
     db: Session = Depends(get_db),
 ) -> RequestContext:
     return RequestPubContext(db=db)
+
+
+def make_etag(request: Request, *versions: int | str, vary: tuple[str, ...] = ()) -> str:
+    """ETag по версиям данных, строке запроса и заголовкам из vary"""
+    parts = [BOOT_ID, request.url.path, request.url.query, *map(str, versions)]
+    parts.extend(request.headers.get(header, "") for header in vary)
+
+    return '"%s"' % hashlib.sha1("|".join(parts).encode()).hexdigest()[:20]
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+
+    if not if_none_match:
+        return False
+
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+
+    return "*" in tags or etag in tags
+
+
+def conditional(
+    *keys: Hashable | Callable[[Request], Hashable],
+    vary: tuple[str, ...] = (),
+    public: bool = False,
+    per_user: Callable[[Request], bool] | None = None,
+):
+    """
+    Зависимость для условных GET: отвечает 304 по If-None-Match, не трогая
+    данные, иначе проставляет ETag. Ключ может быть функцией от запроса,
+    например для раздела из пути; если она вернула None, ключ не учитывается.
+    Кроме public-маршрутов ETag сравнивается только после проверки токена,
+    иначе 304 на угаданный ETag выдавал бы версию данных без авторизации.
+    Если per_user(request) истинно, ответ зависит от пользователя и его id
+    входит в ETag.
+    """
+
+    def dependency(
+        request: Request, response: Response, user: CachedUser | None = None
+    ) -> None:
+        keys_ = [key(request) if callable(key) else key for key in keys]
+        versions = [graph_versions.get(key) for key in keys_ if key is not None]
+        vary_ = vary
+
+        if user is not None and per_user is not None and per_user(request):
+            versions.append(f"user-{user.id}")
+            vary_ = (*vary, "authorization")
+
+        etag = make_etag(request, *versions, vary=vary)
+
+        if is_not_modified(request, etag):
+            raise HTTPException(status_code=304, headers={"ETag": etag})
+
+        response.headers["ETag"] = etag
+
+        if vary_:
+            response.headers["Vary"] = ", ".join(vary_)
+
+    if public:
+        return Depends(dependency)
+
+    def authenticated(
+        request: Request,
+        response: Response,
+        ctx: RequestContext = Depends(get_context),
+    ) -> None:
+        dependency(request, response, ctx.user)
+
+    return Depends(authenticated)
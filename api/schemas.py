@@ -1,4 +1,5 @@
 from datetime import datetime
+from enum import Enum
 from typing import List, Optional, Self
 from pydantic import BaseModel
 
@@ -164,6 +165,186 @@ class GraphDataSchema(BaseModel):
     links: List[LinkSchema]
 
 
+class LayoutNodeSchema(NodeSchema):
+    """Узел с координатами серверной раскладки"""
+
+    x: float
+    y: float
+
+
+class LayoutGraphSchema(BaseModel):
+    nodes: List[LayoutNodeSchema]
+    links: List[LinkSchema]
+
+
+class SummaryNodeSchema(NodeSchema):
+    """Узел типа сводного графа: count - число свернутых в него узлов"""
+
+    count: int
+
+
+class SummaryLinkSchema(LinkSchema):
+    """Связь сводного графа: weight - число объединенных в нее связей"""
+
+    weight: int
+
+
+class SummaryGraphSchema(BaseModel):
+    """
+    Сводный граф раздела. В раскрытом типе рядом с узлами типов лежат
+    обычные узлы и связи.
+    """
+
+    nodes: List[SummaryNodeSchema | NodeSchema]
+    links: List[SummaryLinkSchema | LinkSchema]
+
+
+class GraphNodesPageSchema(BaseModel):
+    """
+    Часть узлов графа. next_cursor передается в следующий запрос, None значит
+    конец. version - версия журнала изменений раздела на момент запроса.
+    """
+
+    version: int
+    items: List[NodeSchema]
+    next_cursor: str | None = None
+
+
+class GraphLinksPageSchema(BaseModel):
+    version: int
+    items: List[LinkSchema]
+    next_cursor: str | None = None
+
+
+class GraphChangesSchema(BaseModel):
+    """
+    Изменения графа раздела после версии since. Связи удаленного узла
+    отдельно не перечисляются: клиент удаляет их вместе с узлом.
+    """
+
+    version: int
+    reset: bool = False
+    nodes_added: List[NodeSchema] = []
+    nodes_updated: List[NodeSchema] = []
+    nodes_removed: List[str] = []
+    links_added: List[LinkSchema] = []
+    links_removed: List[str] = []
+
+
+class GraphNodeTypeSchema(BaseModel):
+    name: str
+    description: str | None = None
+    color: str | None = None
+
+
+class CompactGraphSchema(BaseModel):
+    """
+    Компактный граф: узлы лежат параллельными массивами, тип узла и концы
+    связей заданы индексами в таблицу types и в массивы узлов.
+    """
+
+    types: List[GraphNodeTypeSchema]
+    node_ids: List[str]
+    node_names: List[str]
+    node_types: List[int]
+    link_sources: List[int]
+    link_targets: List[int]
+
+
+class GraphFormat(str, Enum):
+    json = "json"
+    ndjson = "ndjson"
+    compact = "compact"
+    msgpack = "msgpack"
+
+
+class LoopStallSchema(BaseModel):
+    route: str | None = None
+    duration_ms: float
+    detected_at: float
+    stack: str
+
+
+class LoopStallsSchema(BaseModel):
+    """Последние зависания цикла событий, новые первыми"""
+
+    enabled: bool
+    threshold_ms: float
+    stalls_total: int
+    stalls: List[LoopStallSchema]
+
+
+class PoolStatsSchema(BaseModel):
+    size: int
+    max_overflow: int
+    checked_out: int
+    checked_in: int
+    overflow: int
+    checkouts: int
+    timeouts: int
+    wait_time_total_ms: float
+    wait_time_max_ms: float
+
+
+class ThreadpoolStatsSchema(BaseModel):
+    size: int
+    busy: int
+    waiting: int
+
+
+class DbPoolStatsSchema(BaseModel):
+    """Пулы соединений движков (None, если пул без статистики) и пул потоков"""
+
+    engine: PoolStatsSchema | None = None
+    background_engine: PoolStatsSchema | None = None
+    stream_engine: PoolStatsSchema | None = None
+    async_engine: PoolStatsSchema | None = None
+    replica_engine: PoolStatsSchema | None = None
+    async_replica_engine: PoolStatsSchema | None = None
+    threadpool: ThreadpoolStatsSchema
+
+
+class PasswordPoolStatsSchema(BaseModel):
+    workers: int
+    queue_limit: int
+    running: int
+    queued: int
+    max_queued: int
+    completed: int
+    rejected: int
+    time_avg_ms: float
+
+
+class GraphMetricSchema(BaseModel):
+    id: str
+    name: str
+    value: float
+
+
+class GraphAnalyticsSchema(BaseModel):
+    """
+    Метрики графа. degree_distribution[k] - число узлов со степенью k,
+    top_* - узлы с наибольшими значениями метрики.
+    """
+
+    nodes: int
+    links: int
+    degree_distribution: List[int]
+    components: int
+    largest_component: int
+    top_degree: List[GraphMetricSchema]
+    top_pagerank: List[GraphMetricSchema]
+    top_eigenvector: List[GraphMetricSchema]
+    top_betweenness: List[GraphMetricSchema]
+
+
+class GraphDetail(str, Enum):
+    """Полный граф или сводный, где каждый тип узлов свернут в один узел"""
+
+    full = "full"
+    summary = "summary"
+
+
 class ConfigSchemaBase(BaseModel):
     name: str
     description: str
@@ -204,6 +385,7 @@ class UserSchema(BaseModel):
 class SectionCreate(BaseModel):
     name: str
     description: Optional[str] = None
+    is_public: bool | None = None
     user_id: int | None = None
 
     class Config:
@@ -215,6 +397,7 @@ class SectionRead(BaseModel):
     name: str
     description: Optional[str] = None
     dt_create: datetime | None = None
+    is_public: bool = False
     user: UserSchema | None = None
 
     class Config:
@@ -297,3 +480,19 @@ class NodeLink(BaseModel):
     node1_id: int
     node2_id: int
     user_id: int | None = None
+
+
+class NodeChangeCreate(BaseModel):
+    section_id: int
+    entity: str
+    action: str
+    node_id: int
+    node2_id: int | None = None
+
+
+class NodeChangeRead(NodeChangeCreate):
+    id: int
+    dt_create: datetime | None = None
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,214 @@
+"""
+Сравнение сборки графа сотрудников: ORM + pydantic против одного запроса
+UNION ALL с сырыми строками.
+
+    python -m benchmarks.graph_build --employees 10000 100000
+
+По умолчанию данные генерируются во временной SQLite, с DB_URL можно
+прогнать на Postgres. Таблицы перед заполнением очищаются, поэтому на
+непустой базе скрипт запускается только с --wipe.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+import uuid
+
+if "DB_URL" not in os.environ:
+    os.environ["DB_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench.sqlite"
+os.environ.setdefault("SECRET", "bench")
+
+from sqlalchemy import delete, func, insert, select  # noqa: E402
+
+from api.crud import (  # noqa: E402
+    department_crud,
+    employee_crud,
+    position_crud,
+    project_crud,
+)
+from api.db import SessionLocal, engine  # noqa: E402
+from api.models import (  # noqa: E402
+    Base,
+    Department,
+    Employee,
+    Position,
+    Project,
+    employee_department,
+    employee_employee,
+    employee_position,
+    employee_project,
+)
+from api.routes.graph import build_graph  # noqa: E402
+from api.schemas import GraphDataSchema, LinkSchema, NodeSchema  # noqa: E402
+
+# Таблицы, которые заполняет и очищает бенчмарк, связи раньше сущностей
+TABLES = (
+    employee_department,
+    employee_employee,
+    employee_position,
+    employee_project,
+    Employee.__table__,
+    Department.__table__,
+    Position.__table__,
+    Project.__table__,
+)
+
+
+def legacy_build_graph(db) -> bytes:
+    """Прежняя сборка: get_all по моделям, отдельные запросы по связям, pydantic"""
+    nodes = [
+        NodeSchema(id=e.uuid, name=e.fio, type="employee")
+        for e in employee_crud.get_all(db=db)
+    ]
+    nodes += [
+        NodeSchema(
+            id=f"department-{d.id}", name=d.name or f"Dept {d.id}", type="department"
+        )
+        for d in department_crud.get_all(db=db)
+    ]
+    nodes += [
+        NodeSchema(id=f"position-{p.id}", name=p.value, type="position")
+        for p in position_crud.get_all(db=db)
+    ]
+    nodes += [
+        NodeSchema(id=f"project-{p.id}", name=p.value, type="project")
+        for p in project_crud.get_all(db=db)
+    ]
+
+    links = []
+    for table, prefix, target in (
+        (employee_department, "ed", "department-{}"),
+        (employee_project, "ep", "project-{}"),
+        (employee_position, "epos", "position-{}"),
+        (employee_employee, "ee", "{}"),
+    ):
+        for a, b in db.execute(select(table)).fetchall():
+            links.append(
+                LinkSchema(id=f"{prefix}-{a}-{b}", source=a, target=target.format(b))
+            )
+
+    return GraphDataSchema(nodes=nodes, links=links).model_dump_json().encode()
+
+
+def ensure_empty(db, wipe: bool) -> None:
+    """Не дает очистить таблицы с чужими данными без --wipe"""
+    filled = [
+        table.name
+        for table in TABLES
+        if db.scalar(select(func.count()).select_from(table))
+    ]
+
+    if filled and not wipe:
+        raise SystemExit(
+            f"Таблицы {', '.join(filled)} не пустые, их данные будут удалены. "
+            "Запустите с --wipe, если это тестовая база."
+        )
+
+
+def fill(db, employees: int) -> None:
+    for table in TABLES:
+        db.execute(delete(table))
+
+    departments = max(employees // 50, 1)
+    positions = 50
+    projects = max(employees // 20, 1)
+
+    db.execute(
+        insert(Department),
+        [dict(id=i, name=f"Отдел {i}") for i in range(1, departments + 1)],
+    )
+    db.execute(
+        insert(Position),
+        [dict(id=i, value=f"Должность {i}") for i in range(1, positions + 1)],
+    )
+    db.execute(
+        insert(Project),
+        [dict(id=i, value=f"Проект {i}") for i in range(1, projects + 1)],
+    )
+
+    uuids = [str(uuid.uuid4()) for _ in range(employees)]
+    db.execute(
+        insert(Employee), [dict(uuid=u, fio=f"Сотрудник {i}") for i, u in enumerate(uuids)]
+    )
+    db.execute(
+        insert(employee_department),
+        [
+            dict(employee_uuid=u, departments_id=i % departments + 1)
+            for i, u in enumerate(uuids)
+        ],
+    )
+    db.execute(
+        insert(employee_position),
+        [dict(employee_uuid=u, position_id=i % positions + 1) for i, u in enumerate(uuids)],
+    )
+    db.execute(
+        insert(employee_project),
+        [
+            dict(employee_uuid=u, project_id=(i + k) % projects + 1)
+            for i, u in enumerate(uuids)
+            for k in range(min(2, projects))
+        ],
+    )
+    db.execute(
+        insert(employee_employee),
+        [
+            dict(employee1_uuid=u, employee2_uuid=uuids[(i + 1) % employees])
+            for i, u in enumerate(uuids)
+        ],
+    )
+    db.commit()
+
+
+def measure(build, repeat: int) -> float:
+    timings = []
+
+    for _ in range(repeat):
+        with SessionLocal() as db:
+            started = time.perf_counter()
+            build(db)
+            timings.append(time.perf_counter() - started)
+
+    return statistics.median(timings)
+
+
+def same_graph(a: bytes, b: bytes) -> bool:
+    a, b = json.loads(a), json.loads(b)
+
+    return all(
+        sorted(a[key], key=lambda x: x["id"]) == sorted(b[key], key=lambda x: x["id"])
+        for key in ("nodes", "links")
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--employees", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--wipe", action="store_true", help="очистить непустые таблицы базы DB_URL"
+    )
+    args = parser.parse_args()
+
+    Base.metadata.create_all(engine)
+
+    with SessionLocal() as db:
+        ensure_empty(db, args.wipe)
+
+    print(f"{'employees':>10} {'legacy, s':>10} {'union, s':>10} {'speedup':>8}")
+
+    for employees in args.employees:
+        with SessionLocal() as db:
+            fill(db, employees)
+            assert same_graph(legacy_build_graph(db), build_graph(db))
+
+        legacy = measure(legacy_build_graph, args.repeat)
+        fast = measure(build_graph, args.repeat)
+
+        print(f"{employees:>10} {legacy:>10.3f} {fast:>10.3f} {legacy / fast:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
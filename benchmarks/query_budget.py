@@ -0,0 +1,125 @@
+"""
+Проверка бюджетов SQL-запросов на маршрутах чтения.
+
+    python -m benchmarks.query_budget
+
+Заполняет временную SQLite разделом с узлами и связями, включает строгий
+режим QUERY_BUDGET_STRICT и обходит маршруты с query_budget. Если маршрут
+выходит за бюджет (например, вернулась ленивая загрузка), скрипт завершается
+с ненулевым кодом. Нужен httpx для fastapi.testclient.
+"""
+
+import os
+import sys
+import tempfile
+
+if "DB_URL" not in os.environ:
+    os.environ["DB_URL"] = f"sqlite:///{tempfile.mkdtemp()}/budget.sqlite"
+os.environ.setdefault("SECRET", "bench")
+os.environ["QUERY_BUDGET_STRICT"] = "1"
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import event, insert  # noqa: E402
+
+from api.db import SessionLocal, engine  # noqa: E402
+from api.models import Base, Node, NodeType, Section, node_node  # noqa: E402
+from app import app  # noqa: E402
+
+NODES = 300
+TYPES = 6
+
+
+def fill(user_id: int) -> None:
+    with SessionLocal() as db:
+        db.execute(insert(Section), [dict(id=1, name="Раздел", user_id=user_id)])
+        db.execute(
+            insert(NodeType),
+            [
+                dict(
+                    id=i,
+                    name=f"Тип {i}",
+                    description=f"Описание {i}",
+                    section_id=1,
+                    user_id=user_id,
+                    color="#fff",
+                )
+                for i in range(1, TYPES + 1)
+            ],
+        )
+        db.execute(
+            insert(Node),
+            [
+                dict(id=i, name=f"Узел {i}", type_id=i % TYPES + 1, user_id=user_id)
+                for i in range(1, NODES + 1)
+            ],
+        )
+        db.execute(
+            insert(node_node),
+            [
+                dict(node1_id=i, node2_id=(i + k) % NODES + 1, user_id=user_id)
+                for i in range(1, NODES + 1)
+                for k in (1, 7)
+            ],
+        )
+        db.commit()
+
+
+def main() -> int:
+    Base.metadata.create_all(engine)
+    client = TestClient(app)
+
+    client.post("/register", data={"username": "budget", "password": "budget"})
+    token = client.post(
+        "/token", data={"username": "budget", "password": "budget"}
+    ).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    fill(user_id=1)
+
+    statements = []
+    event.listen(
+        engine,
+        "before_cursor_execute",
+        lambda *args: statements.append(args[2]),
+    )
+
+    failed = False
+    routes = [
+        "/nodes/?limit=1000",
+        "/nodes/1",
+        "/nodes/by-section/1",
+        "/node-types/",
+        "/node-types/by-section/1",
+        "/node-types/1",
+        "/sections/",
+        "/graph",
+        "/graph/section/1",
+        "/graph/section/1?layout=true",
+        "/graph/section/1?detail=summary",
+        "/graph/section/1?layout=true&summary_over=100",
+        "/graph/section/1/types/1?expanded=2",
+        "/graph/section/1/changes?since=0",
+        "/graph/analytics",
+        "/graph/section/1/analytics",
+        "/graph/section/1/path?source=1&target=21",
+        "/graph/section/1/nodes?limit=100",
+        "/graph/section/1/links?limit=100",
+    ]
+
+    for url in routes:
+        statements.clear()
+
+        try:
+            response = client.get(url, headers=headers)
+            status = response.status_code
+        except Exception as e:
+            status = f"{type(e).__name__}: {str(e).splitlines()[0]}"
+
+        ok = status == 200
+        failed |= not ok
+        print(f"{'ok ' if ok else 'FAIL'} {len(statements):>3} запросов  {url}  {status}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
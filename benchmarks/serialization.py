@@ -0,0 +1,214 @@
+"""
+Стоимость сериализации строки в списочных маршрутах: ORM-объекты с проверкой
+pydantic (from_attributes, как response_model) против read_rows и orjson.
+
+    python -m benchmarks.serialization --nodes 1000 10000
+
+По умолчанию данные генерируются во временной SQLite, с DB_URL можно
+прогнать на Postgres. Таблицы перед заполнением очищаются, поэтому на
+непустой базе скрипт запускается только с --wipe.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from typing import List
+
+if "DB_URL" not in os.environ:
+    os.environ["DB_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench.sqlite"
+os.environ.setdefault("SECRET", "bench")
+
+import orjson  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+from sqlalchemy import delete, func, insert, select  # noqa: E402
+
+from api.crud import (  # noqa: E402
+    employee_crud,
+    node_crud,
+    node_type_crud,
+    section_crud,
+)
+from api.db import SessionLocal, engine  # noqa: E402
+from api.models import (  # noqa: E402
+    Base,
+    Employee,
+    Node,
+    NodeType,
+    Section,
+    User,
+    node_node,
+)
+from api.schemas import EmployeeRead, NodeRead, NodeTypeRead, SectionRead  # noqa: E402
+
+# Маршрут, CRUD и схема ответа
+CASES = (
+    ("/employee/", employee_crud, EmployeeRead),
+    ("/sections/", section_crud, SectionRead),
+    ("/nodes/", node_crud, NodeRead),
+    ("/node-types/", node_type_crud, NodeTypeRead),
+)
+# Таблицы, которые заполняет и очищает бенчмарк
+TABLES = (
+    node_node,
+    Node.__table__,
+    NodeType.__table__,
+    Section.__table__,
+    Employee.__table__,
+    User.__table__,
+)
+
+
+def ensure_empty(db, wipe: bool) -> None:
+    """Не дает очистить таблицы с чужими данными без --wipe"""
+    filled = [
+        table.name
+        for table in TABLES
+        if db.scalar(select(func.count()).select_from(table))
+    ]
+
+    if filled and not wipe:
+        raise SystemExit(
+            f"Таблицы {', '.join(filled)} не пустые, их данные будут удалены. "
+            "Запустите с --wipe, если это тестовая база."
+        )
+
+
+def fill(db, nodes: int) -> None:
+    for table in TABLES:
+        db.execute(delete(table))
+
+    users = 10
+    sections = max(nodes // 500, 1)
+    types = max(nodes // 50, 1)
+
+    db.execute(
+        insert(User),
+        [
+            dict(id=i, username=f"user{i}", hashed_password=f"hash{i}", is_active=True)
+            for i in range(1, users + 1)
+        ],
+    )
+    db.execute(
+        insert(Section),
+        [
+            dict(id=i, name=f"Раздел {i}", user_id=i % users + 1)
+            for i in range(1, sections + 1)
+        ],
+    )
+    db.execute(
+        insert(NodeType),
+        [
+            dict(
+                id=i,
+                name=f"Тип {i}",
+                description=f"Описание {i}",
+                section_id=i % sections + 1,
+                user_id=i % users + 1,
+                color="#fff",
+            )
+            for i in range(1, types + 1)
+        ],
+    )
+    db.execute(
+        insert(Node),
+        [
+            dict(id=i, name=f"Узел {i}", type_id=i % types + 1, user_id=i % users + 1)
+            for i in range(1, nodes + 1)
+        ],
+    )
+    db.execute(
+        insert(node_node),
+        [
+            dict(node1_id=i, node2_id=(i + k) % nodes + 1, user_id=1)
+            for i in range(1, nodes + 1)
+            for k in (1, 7)
+            if (i + k) % nodes + 1 != i
+        ],
+    )
+    db.execute(
+        insert(Employee), [dict(uuid=f"e-{i}", fio=f"Сотрудник {i}") for i in range(nodes)]
+    )
+    db.commit()
+
+
+def validated(crud, schema, db) -> bytes:
+    """Как response_model: ORM-объекты, проверка from_attributes, dump_json"""
+    adapter = TypeAdapter(List[schema])
+    objects = crud.get_all(db)
+
+    return adapter.dump_json(adapter.validate_python(objects, from_attributes=True))
+
+
+def trusted(crud, schema, db) -> bytes:
+    return orjson.dumps(crud.read_rows(db))
+
+
+def normalized(data: bytes):
+    """Порядок вложенных списков зависит от плана запроса, сравниваем без него"""
+
+    def walk(value):
+        if isinstance(value, list):
+            return sorted((walk(item) for item in value), key=json.dumps)
+        if isinstance(value, dict):
+            return {key: walk(item) for key, item in value.items()}
+        return value
+
+    return walk(json.loads(data))
+
+
+def measure(serialize, crud, schema, repeat: int) -> float:
+    timings = []
+
+    for _ in range(repeat):
+        with SessionLocal() as db:
+            started = time.perf_counter()
+            serialize(crud, schema, db)
+            timings.append(time.perf_counter() - started)
+
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--nodes", type=int, nargs="+", default=[1_000, 10_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--wipe", action="store_true", help="очистить непустые таблицы базы DB_URL"
+    )
+    args = parser.parse_args()
+
+    Base.metadata.create_all(engine)
+
+    with SessionLocal() as db:
+        ensure_empty(db, args.wipe)
+
+    print(
+        f"{'route':<14} {'rows':>7} {'pydantic, us/row':>17} "
+        f"{'rows, us/row':>13} {'speedup':>8}"
+    )
+
+    for nodes in args.nodes:
+        with SessionLocal() as db:
+            fill(db, nodes)
+
+        for route, crud, schema in CASES:
+            with SessionLocal() as db:
+                rows = len(crud.read_rows(db))
+                assert normalized(validated(crud, schema, db)) == normalized(
+                    trusted(crud, schema, db)
+                ), route
+
+            before = measure(validated, crud, schema, args.repeat) / rows * 1e6
+            after = measure(trusted, crud, schema, args.repeat) / rows * 1e6
+
+            print(
+                f"{route:<14} {rows:>7} {before:>17.1f} "
+                f"{after:>13.1f} {before / after:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
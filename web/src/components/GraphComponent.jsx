@@ -6,7 +6,12 @@ import React, {
   useMemo,
 } from "react";
 import ForceGraph2D from "react-force-graph-2d";
-import { getGraph, getNodesConfig, saveNodesConfig } from "../services/api";
+import {
+  getGraph,
+  getGraphSectionType,
+  getNodesConfig,
+  saveNodesConfig,
+} from "../services/api";
 import { Loader } from "./Loader";
 import {
   Box,
@@ -483,6 +488,8 @@ export function GraphSectionComponent({ publicView = false, sectionId } = {}) {
   const [highlightNodes, setHighlightNodes] = useState(new Set());
   const [highlightLinks, setHighlightLinks] = useState(new Set());
   const [graphDataRaw, setGraphDataRaw] = useState({ nodes: [], links: [] });
+  const [serverLayout, setServerLayout] = useState(false);
+  const [expandedTypes, setExpandedTypes] = useState([]);
   const [loading, setLoading] = useState(true);
   const [nodeConfig, setNodeConfig] = useState({});
   const [configIsChenged, setConfigIsChenged] = useState(false);
@@ -568,18 +575,21 @@ export function GraphSectionComponent({ publicView = false, sectionId } = {}) {
   useEffect(() => {
     getGraph({ publicView, sectionId })
       .then((data) => {
-        // Удаляем зафиксированные координаты, чтобы включилась физика
+        // Координаты посчитаны на сервере: физику в браузере не запускаем
+        const hasLayout = data.nodes.some((node) => node.x != null);
         const currentNodeTypes = {}
         const cleanedData = {
           nodes: data.nodes.map((node) => {
             // eslint-disable-next-line no-unused-vars
             const { x, y, vx, vy, ...rest } = node;
             currentNodeTypes[rest.type] = rest
-            return rest;
+            return hasLayout ? { ...rest, x, y } : rest;
           }),
           links: data.links,
         };
         setNodeTypes(currentNodeTypes)
+        setServerLayout(hasLayout);
+        setExpandedTypes([]);
         setGraphDataRaw(cleanedData);
       })
       .catch((e) => {
@@ -624,8 +634,39 @@ export function GraphSectionComponent({ publicView = false, sectionId } = {}) {
     );
   };
 
+  // Раскрываем узел типа сводного графа: заменяем его узлами этого типа
+  const handleExpandType = (typeNode) => {
+    const typeId = typeNode.id.replace("type-", "");
+    const linkEnd = (end) => end.id || end;
+
+    getGraphSectionType(sectionId, typeId, expandedTypes)
+      .then((data) => {
+        setExpandedTypes((prev) => [...prev, typeId]);
+        setServerLayout(false);
+        setGraphDataRaw((prev) => ({
+          nodes: [
+            ...prev.nodes.filter((n) => n.id !== typeNode.id),
+            ...data.nodes,
+          ],
+          links: [
+            ...prev.links.filter(
+              (l) =>
+                linkEnd(l.source) !== typeNode.id &&
+                linkEnd(l.target) !== typeNode.id
+            ),
+            ...data.links,
+          ],
+        }));
+      })
+      .catch((e) => {
+        console.debug("error => " + e);
+      });
+  };
+
   const handleNodeClick = (node) => {
-    if (highlightNode && highlightNode.id === node.id) {
+    if (node.count != null) {
+      handleExpandType(node);
+    } else if (highlightNode && highlightNode.id === node.id) {
       // Уже выделена эта нода - сброс
       setHighlightNode(null);
       setHighlightNodes(new Set());
@@ -718,6 +759,7 @@ export function GraphSectionComponent({ publicView = false, sectionId } = {}) {
           linkDirectionalParticleWidth={1}
           backgroundColor="#121212"
           linkDistance={nodeConfig.distance}
+          cooldownTicks={serverLayout ? 0 : Infinity}
           nodeCanvasObject={(node, ctx, globalScale) => {
             const label = node.name;
             const fontSize = 12 / globalScale;
@@ -783,7 +825,11 @@ export function GraphSectionComponent({ publicView = false, sectionId } = {}) {
           linkDirectionalArrowLength={4}
           linkDirectionalArrowRelPos={1}
           onNodeClick={handleNodeClick}
-          nodeLabel={(node) => `${node.name} (${node.type})`}
+          nodeLabel={(node) =>
+            node.count != null
+              ? `${node.name}: ${node.count} (нажмите, чтобы раскрыть)`
+              : `${node.name} (${node.type})`
+          }
         />
         {graphData?.nodes?.length === 0 && (
           <Box
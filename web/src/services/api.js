@@ -84,12 +84,15 @@ export async function getCountPositions() {
 export async function getCountProjects() {
     return await getCounts("projects")
 }
+// Раздел больше стольких узлов приходит сводным графом по типам
+const SECTION_SUMMARY_NODES = 5000;
+
 export async function getGraph({ publicView, sectionId } = {}) {
     if( publicView && sectionId !== undefined ){
         return await getData(`${API_BASE_URL}/public/graph/section/${sectionId}`, false);
     }
     else if( sectionId !== undefined ){
-        return await getData(`${API_BASE_URL}/graph/section/${sectionId}`);
+        return await getData(`${API_BASE_URL}/graph/section/${sectionId}?layout=true&summary_over=${SECTION_SUMMARY_NODES}`);
     }
     else if( publicView ){
         return await getData(`${API_BASE_URL}/public/graph`, false);
@@ -97,6 +100,10 @@ export async function getGraph({ publicView, sectionId } = {}) {
         return await getData(`${API_BASE_URL}/graph`);
     }
 }
+export async function getGraphSectionType(sectionId, typeId, expanded = []) {
+    const query = expanded.map((id) => `expanded=${id}`).join("&");
+    return await getData(`${API_BASE_URL}/graph/section/${sectionId}/types/${typeId}?${query}`);
+}
 export async function getToken(data){
     const formData = new FormData()
 